@@ -12,11 +12,79 @@ Experimental logging extended by: Oliver Lazarus-Keene
 """
 
 from abc import ABC, abstractmethod
+from collections import OrderedDict
 import random
 import csv
+import io
 import os
+import tempfile
+import time
+
+import numpy as np
 
 import config
+from reporting import GenerationSnapshot, PrintReporter
+from phase_timing import PhaseStats, instrument_phases
+
+
+def sum_tour_lengths(matrix, tours):
+    """
+    Sum the closed-tour length of every row of a (P x n) array of city
+    indices with one gather over the distance matrix.
+
+    Edges are accumulated left to right (a cumulative sum along each row,
+    rather than np.sum's pairwise summation), in the same order as
+    calculate_fitness(), so both give exactly the same result.
+    """
+    edges = matrix[tours, np.roll(tours, -1, axis=1)]
+    if edges.shape[1] == 0:
+        return np.zeros(len(tours))
+    return np.cumsum(edges, axis=1)[:, -1]
+
+
+# columns of the rows written by AbstractGA._append_run_to_csv
+RESULTS_CSV_HEADER = [
+    "city_count",
+    "population_size",
+    "max_generations",
+    "stall_limit",
+    "mutation_rate",
+    "actual_generations",
+    "best_fitness"
+]
+
+
+def append_csv_rows(filename, rows):
+    """
+    Appends rows to a results CSV file with one os.write() call, so rows
+    written by concurrent processes are never interleaved. A new file is
+    created with RESULTS_CSV_HEADER already in it (written to a temporary
+    file, which is then linked into place), so the header always comes first.
+    """
+    if not os.path.exists(filename):
+        header = io.StringIO()
+        csv.writer(header).writerow(RESULTS_CSV_HEADER)
+        fd, temporary = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(os.path.abspath(filename)))
+        try:
+            os.write(fd, header.getvalue().encode())
+        finally:
+            os.close(fd)
+        try:
+            os.link(temporary, filename)
+        except FileExistsError:
+            pass # another process created it first
+        finally:
+            os.unlink(temporary)
+
+    if not rows:
+        return
+    lines = io.StringIO()
+    csv.writer(lines).writerows(rows)
+    fd = os.open(filename, os.O_WRONLY | os.O_APPEND)
+    try:
+        os.write(fd, lines.getvalue().encode())
+    finally:
+        os.close(fd)
 
 
 class AbstractGA(ABC):
@@ -32,6 +100,30 @@ class AbstractGA(ABC):
         self.best_individual = None
         self.number_of_generations = 0
 
+        # NumPy random generator for the batched operators, seeded from the random module
+        #  so that random.seed() still makes runs reproducible
+        self.rng = np.random.default_rng(random.getrandbits(64))
+
+        # Bounded (least recently used) fitness cache, keyed by canonical_tour_key()
+        self._fitness_cache = OrderedDict()
+        self.reset_fitness_counts()
+
+        # pool of worker processes that score the population (only during run_GA, see FITNESS_PROCESSES)
+        self._parallel_evaluator = None
+
+        # functions called as callback(ga) at the end of every generation (e.g. island migration)
+        self.generation_callbacks = []
+
+        # file that run_GA appends its summary row to (None: do not log the run)
+        self.results_file = "ga_results.csv"
+
+        # reports the progress of run_GA (see reporting.py)
+        self.reporter = PrintReporter(config.REPORT_EVERY)
+
+        # time the phases of each generation; run_GA leaves the times in phase_stats (see phase_timing.py)
+        self.phase_timing = config.PHASE_TIMING
+        self.phase_stats = None
+
     """
     Returns the best individual found and the fitness of that individual.
     """
@@ -40,25 +132,40 @@ class AbstractGA(ABC):
         self.fitnesses = []
         self.best_fitness = -1
         self.best_individual = None
+        self.rng = np.random.default_rng(random.getrandbits(64))
+        self.reset_fitness_counts()
+        self.number_of_generations = 0
+        self.start_time = time.perf_counter()
+
+        self.phase_stats = PhaseStats() if self.phase_timing else None
+        remove_phase_timing = instrument_phases(self, self.phase_stats) if self.phase_timing else None
 
-        # initialise population and calculate fitness
-        self.initialise_population()
-        self.calculate_fitness_of_population()
-        self.number_of_generations = 1
-
-        # run GA
-        while not self.finished():
-            self.produce_new_generation()
-            self.number_of_generations += 1
-            print(
-                "number of generations =",
-                self.number_of_generations,
-                " best fitness = ",
-                self.best_fitness
-            )
+        # start the pool of fitness workers once, and reuse it for every generation
+        self._parallel_evaluator = self._start_parallel_evaluator()
+        try:
+            # initialise population and calculate fitness
+            self.initialise_population()
+            self.calculate_fitness_of_population()
+            self.number_of_generations = 1
+
+            # run GA
+            while not self.finished():
+                self.produce_new_generation()
+                self.number_of_generations += 1
+                if self.reporter.wants(self.number_of_generations):
+                    self.reporter.report(self.generation_snapshot())
+                for callback in self.generation_callbacks:
+                    callback(self)
+        finally:
+            if self._parallel_evaluator is not None:
+                self._parallel_evaluator.close()
+                self._parallel_evaluator = None
+            if remove_phase_timing is not None:
+                remove_phase_timing()
 
         # log one row for this run
-        self._append_run_to_csv()
+        if self.results_file is not None:
+            self._append_run_to_csv(self.results_file)
 
         return (
             self.convert_chromosome_to_city_list(self.best_individual),
@@ -74,15 +181,198 @@ class AbstractGA(ABC):
             chromosome = self.convert_city_list_to_chromosome(cities)
             self.population.append(chromosome)
 
-    """ Calculates fitness for the entire population. """
-    def calculate_fitness_of_population(self):
-        self.fitnesses = [self.calculate_fitness(i) for i in self.population]
+    """ Calculates fitness for the entire population. 
+        known_fitnesses optionally gives the fitness of individuals that is already known 
+        (e.g. from their parent), with None for those that need to be evaluated.
+        Individuals that are not known are looked-up in the fitness cache before being evaluated.
+    """
+    def calculate_fitness_of_population(self, known_fitnesses=None):
+        if known_fitnesses is None:
+            known_fitnesses = [None] * len(self.population)
+        self.fitnesses = list(known_fitnesses)
+        self.inherited_fitness_count += len(known_fitnesses) - known_fitnesses.count(None)
+
+        # positions in the population of each tour that is not in the cache
+        #  (equivalent tours produced in the same generation are only evaluated once)
+        to_evaluate = OrderedDict()
+        for i, fitness in enumerate(known_fitnesses):
+            if fitness is not None:
+                continue
+            key = self.canonical_tour_key(self.population[i])
+            if key is None:
+                to_evaluate[("uncached", i)] = [i]
+            elif key in self._fitness_cache:
+                self._fitness_cache.move_to_end(key)
+                self.fitnesses[i] = self._fitness_cache[key]
+                self.fitness_cache_hits += 1
+            elif key in to_evaluate:
+                to_evaluate[key].append(i)
+                self.fitness_cache_hits += 1
+            else:
+                to_evaluate[key] = [i]
+                self.fitness_cache_misses += 1
+
+        chromosomes = [self.population[positions[0]] for positions in to_evaluate.values()]
+        self.number_of_evaluations += len(chromosomes)
+
+        tours = self._chromosomes_as_tours(chromosomes)
+        if tours is not None:
+            # score the whole population with one gather over the distance matrix
+            fitnesses = self.calculate_tour_lengths(tours).tolist()
+        else:
+            fitnesses = [self.calculate_fitness(chromosome) for chromosome in chromosomes]
+
+        for (key, positions), fitness in zip(to_evaluate.items(), fitnesses):
+            for i in positions:
+                self.fitnesses[i] = fitness
+            if isinstance(key, bytes):
+                self._cache_fitness(key, fitness)
 
         for i in range(len(self.population)):
             if self.best_individual is None or self.fitnesses[i] < self.best_fitness:
                 self.best_fitness = self.fitnesses[i]
                 self.best_individual = self.population[i]
 
+    def generation_snapshot(self):
+        """ The state of the GA at the end of the current generation, for the reporter. """
+        return GenerationSnapshot(
+            self.number_of_generations,
+            self.best_fitness,
+            self.best_individual,
+            self.fitnesses,
+            time.perf_counter() - self.start_time
+        )
+
+    def receive_individuals(self, chromosomes, fitnesses):
+        """
+        Replaces the worst individuals of the population with the provided
+        chromosomes (whose fitness is already known), e.g. migrants from
+        another island, and updates the best individual.
+        """
+        worst = np.argsort(self.fitnesses)[::-1][:len(chromosomes)]
+        for i, chromosome, fitness in zip(worst, chromosomes, fitnesses):
+            self.population[i] = chromosome
+            self.fitnesses[i] = fitness
+            if fitness < self.best_fitness:
+                self.best_fitness = fitness
+                self.best_individual = chromosome
+
+    # ------------------------------------------------------------------
+    # Fitness cache
+    # ------------------------------------------------------------------
+    def reset_fitness_counts(self):
+        """
+        Resets the counts of how each fitness was obtained:
+        - fitness_cache_hits: found in the fitness cache (or earlier in the same generation)
+        - fitness_cache_misses: not in the cache, so evaluated
+        - inherited_fitness_count: copied/corrected from the parent, without a look-up
+        - number_of_evaluations: the number of tours actually scored
+        """
+        self.fitness_cache_hits = 0
+        self.fitness_cache_misses = 0
+        self.inherited_fitness_count = 0
+        self.number_of_evaluations = 0
+
+    def canonical_tour_key(self, chromosome):
+        """
+        Returns a hashable key that is the same for every rotation and
+        direction of the same tour (they all have the same fitness), or None
+        if the chromosome cannot be cached.
+
+        The tour is rotated to start at city 0 and then read in the
+        direction whose second city has the smaller index.
+        """
+        if not isinstance(chromosome, np.ndarray) or len(chromosome) < 3:
+            return None
+
+        tour = np.roll(chromosome, -int(np.argmin(chromosome)))
+        if tour[-1] < tour[1]:
+            tour[1:] = tour[:0:-1]
+        return tour.tobytes()
+
+    def _cache_fitness(self, key, fitness):
+        """ Adds a fitness to the cache, discarding the least recently used if it is full. """
+        if config.FITNESS_CACHE_SIZE <= 0:
+            return
+        self._fitness_cache[key] = fitness
+        if len(self._fitness_cache) > config.FITNESS_CACHE_SIZE:
+            self._fitness_cache.popitem(last=False)
+
+    # ------------------------------------------------------------------
+    # Vectorised fitness
+    # ------------------------------------------------------------------
+    def fitness_distance_matrix(self):
+        """
+        Return the (n x n) matrix of city-to-city costs used by
+        calculate_fitness(), indexed by City.index, or None if the fitness
+        cannot be expressed as a sum over such a matrix.
+        """
+        return None
+
+    def calculate_tour_lengths(self, tours):
+        """
+        Sum the closed-tour length of every row of a (P x n) array of city
+        indices over the distance matrix (see sum_tour_lengths), in the
+        pool of fitness workers if one is running.
+        """
+        if self._parallel_evaluator is not None:
+            return self._parallel_evaluator.tour_lengths(tours)
+        return sum_tour_lengths(self.fitness_distance_matrix(), tours)
+
+    def _start_parallel_evaluator(self):
+        """
+        Starts a pool of FITNESS_PROCESSES workers that read the distance
+        matrix from shared memory, or returns None to score the population
+        in this process (one process, or no dense matrix to share).
+        """
+        if config.FITNESS_PROCESSES <= 1:
+            return None
+        matrix = self.fitness_distance_matrix()
+        if not isinstance(matrix, np.ndarray):
+            return None
+
+        from parallel_fitness import ParallelFitnessEvaluator
+        return ParallelFitnessEvaluator(matrix, config.FITNESS_PROCESSES)
+
+    def _chromosomes_as_tours(self, chromosomes):
+        """
+        Returns the chromosomes as a (P x n) array of city indices, or None if
+        the vectorised fitness cannot be used (no distance matrix, or cities
+        that do not belong to the world).
+        """
+        if not chromosomes or self.fitness_distance_matrix() is None:
+            return None
+
+        if all(isinstance(chromosome, np.ndarray) for chromosome in chromosomes):
+            return np.stack(chromosomes)
+
+        tours = []
+        for chromosome in chromosomes:
+            indices = [city.index for city in self.convert_chromosome_to_city_list(chromosome)]
+            if None in indices:
+                return None
+            tours.append(indices)
+        return np.array(tours, dtype=np.intp)
+
+    def calculate_edge_change(self, before, after, edge_positions):
+        """
+        Returns the change in fitness caused by a mutation that turned the
+        tour `before` into `after`, where edge_positions are the positions k
+        of every edge (tour[k], tour[k + 1]) whose cities may have changed.
+
+        This costs O(len(edge_positions)) instead of re-scoring the tour.
+        Returns None if the fitness is not a sum over the distance matrix.
+        """
+        matrix = self.fitness_distance_matrix()
+        if matrix is None or not isinstance(after, np.ndarray):
+            return None
+
+        length = len(after)
+        change = 0.0
+        for k in edge_positions:
+            change += float(matrix[after[k], after[(k + 1) % length]]) - float(matrix[before[k], before[(k + 1) % length]])
+        return float(change)
+
     # ------------------------------------------------------------------
     # CSV logging (ONE ROW PER RUN)
     # ------------------------------------------------------------------
@@ -90,32 +380,20 @@ class AbstractGA(ABC):
         """
         Append summary statistics for a single GA run.
         Designed for parameter-sweep experiments.
+
+        Safe when many processes append to the same file at once: the row
+        (and the header, for a new file) is written with a single write to
+        a file opened in append mode, which the OS applies atomically.
         """
-        file_exists = os.path.isfile(filename)
-
-        with open(filename, "a", newline="") as csvfile:
-            writer = csv.writer(csvfile)
-
-            if not file_exists:
-                writer.writerow([
-                    "city_count",
-                    "population_size",
-                    "max_generations",
-                    "stall_limit",
-                    "mutation_rate",
-                    "actual_generations",
-                    "best_fitness"
-                ])
-
-            writer.writerow([
-                len(self.world.get_cities()),
-                config.POPULATION_SIZE,
-                config.MAX_NUMBER_OF_GENERATIONS,
-                getattr(config, "STALL_LIMIT", None),
-                config.MUTATION_RATE,
-                self.number_of_generations,
-                self.best_fitness
-            ])
+        append_csv_rows(filename, [[
+            len(self.world.city_table),
+            config.POPULATION_SIZE,
+            config.MAX_NUMBER_OF_GENERATIONS,
+            getattr(config, "STALL_LIMIT", None),
+            config.MUTATION_RATE,
+            self.number_of_generations,
+            self.best_fitness
+        ]])
 
     # ------------------------------------------------------------------
     # abstract methods
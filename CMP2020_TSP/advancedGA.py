@@ -7,7 +7,7 @@ Extensions beyond the baseline GA:
 - Roulette wheel (fitness-proportionate) selection
 - Inversion mutation
 - Walls-aware fitness using BFS shortest paths
-- Cached city-to-city path distances for efficiency
+- City-to-city path distances precomputed with one BFS flood per city
 - Improved stopping condition using convergence (stagnation)
 
 Modified by: Oliver Lazarus-Keene
@@ -16,6 +16,8 @@ Modified by: Oliver Lazarus-Keene
 import random
 from collections import deque
 
+import numpy as np
+
 import config
 from baselineGA import BaselineGA
 
@@ -51,6 +53,12 @@ class AdvancedGA(BaselineGA):
         Returns:
             One selected chromosome.
         """
+        return self.population[self._roulette_selection_index()]
+
+    def _roulette_selection_index(self):
+        """
+        Returns the index of the individual chosen by the roulette wheel.
+        """
         epsilon = 1e-9
 
         weights = []
@@ -64,44 +72,107 @@ class AdvancedGA(BaselineGA):
 
         # Fallback to uniform random selection if all weights are zero
         if total_weight <= 0.0:
-            return random.choice(self.population)
+            return random.randrange(len(self.population))
 
         pick = random.uniform(0.0, total_weight)
         current = 0.0
 
-        for individual, weight in zip(self.population, weights):
+        for index, weight in enumerate(weights):
             current += weight
             if current >= pick:
-                return individual
+                return index
+
+        return len(self.population) - 1  # safety fallback
+
+    def _roulette_weights(self):
+        """
+        Selection weights as a NumPy array: 1 / fitness, or 0 for missing
+        or negative fitnesses (as in _roulette_selection_index).
+        """
+        epsilon = 1e-9
+        fitnesses = np.array([-1.0 if f is None else f for f in self.fitnesses], dtype=float)
+        weights = np.zeros(len(fitnesses))
+        valid = fitnesses >= 0
+        weights[valid] = 1.0 / (fitnesses[valid] + epsilon)
+        return weights
+
+    def roulette_selection_indices(self, count):
+        """
+        Spins the roulette wheel `count` times at once.
+
+        The cumulative sum of the weights is built once per generation and
+        each spin is a binary search into it, so selecting a generation
+        costs O(P + count log P) rather than O(P * count).
+
+        Returns:
+            An array of the indices of the selected individuals.
+        """
+        weights = self._roulette_weights()
+        cumulative = np.cumsum(weights)
+        total_weight = cumulative[-1]
+
+        # Fallback to uniform random selection if all weights are zero
+        if total_weight <= 0.0:
+            return self.rng.integers(0, len(weights), size=count)
+
+        picks = self.rng.random(count) * total_weight
+        indices = np.searchsorted(cumulative, picks, side="right")
+        return np.minimum(indices, len(weights) - 1)
+
+    def stochastic_universal_sampling_indices(self, count):
+        """
+        Stochastic universal sampling: one spin of a wheel with `count`
+        equally spaced pointers, so each individual is selected (almost)
+        exactly in proportion to its weight. Costs O(P + count).
+
+        Returns:
+            An array of the indices of the selected individuals, in a
+            random order (so consecutive parents are not neighbours on the
+            wheel).
+        """
+        weights = self._roulette_weights()
+        cumulative = np.cumsum(weights)
+        total_weight = cumulative[-1]
 
-        return self.population[-1]  # safety fallback
+        if total_weight <= 0.0:
+            return self.rng.integers(0, len(weights), size=count)
+
+        step = total_weight / count
+        pointers = self.rng.uniform(0.0, step) + step * np.arange(count)
+        indices = np.minimum(np.searchsorted(cumulative, pointers, side="right"), len(weights) - 1)
+        return self.rng.permutation(indices)
 
     # ------------------------------------------------------------------
     # Inversion Mutation
     # ------------------------------------------------------------------
-    def perform_mutation(self, individual):
+    def perform_mutation_with_change(self, individual):
         """
         Inversion mutation.
 
         With probability MUTATION_RATE, selects two indices i < j and
         reverses the subsequence individual[i:j].
 
+        As costs are symmetric, only the two edges at either end of the
+        reversed subsequence change.
+
         Returns:
-            A (possibly mutated) copy of the chromosome.
+            (mutant, change): a (possibly mutated) copy of the chromosome and
+            the change in fitness (None if it cannot be calculated).
         """
         mutant = individual.copy()
 
         if random.random() > config.MUTATION_RATE:
-            return mutant
+            return mutant, 0.0
 
         length = len(mutant)
         if length < 2:
-            return mutant
+            return mutant, 0.0
 
         i, j = sorted(random.sample(range(length), 2))
-        mutant[i:j] = reversed(mutant[i:j])
+        mutant[i:j] = mutant[i:j][::-1]
 
-        return mutant
+        edge_positions = {(i - 1) % length, j - 1}
+        return mutant, self.calculate_edge_change(individual, mutant, edge_positions)
 
     # ------------------------------------------------------------------
     # BFS shortest path (walls-aware)
@@ -109,7 +180,8 @@ class AdvancedGA(BaselineGA):
     def _bfs_shortest_path_length(self, start_pose, goal_pose):
         """
         Computes the shortest number of valid moves between two poses
-        using BFS, expanding only actions returned by world.get_actions(),
+        using BFS, expanding only the cells returned by
+        world.neighbour_cells() (the same moves as world.get_actions()),
         thereby respecting walls and boundaries.
 
         Returns:
@@ -118,27 +190,28 @@ class AdvancedGA(BaselineGA):
         if start_pose.x == goal_pose.x and start_pose.y == goal_pose.y:
             return 0
 
+        start = self.world.cell_index(start_pose.x, start_pose.y)
+        goal = self.world.cell_index(goal_pose.x, goal_pose.y)
+
         queue = deque()
-        queue.append((start_pose, 0))
+        queue.append((start, 0))
 
-        visited = set()
-        visited.add((start_pose.x, start_pose.y))
+        visited = bytearray(len(self.world.blocked))
+        visited[start] = 1
 
         while queue:
-            current_pose, dist = queue.popleft()
-
-            # Expand only legal actions (respects walls)
-            for next_pose in self.world.get_actions(current_pose):
-                key = (next_pose.x, next_pose.y)
+            current, dist = queue.popleft()
 
-                if key in visited:
+            # Expand only legal moves (respects walls)
+            for neighbour in self.world.neighbour_cells(current):
+                if visited[neighbour]:
                     continue
 
-                if next_pose.x == goal_pose.x and next_pose.y == goal_pose.y:
+                if neighbour == goal:
                     return dist + 1
 
-                visited.add(key)
-                queue.append((next_pose, dist + 1))
+                visited[neighbour] = 1
+                queue.append((neighbour, dist + 1))
 
         return None  # unreachable
 
@@ -161,11 +234,51 @@ class AdvancedGA(BaselineGA):
     # ------------------------------------------------------------------
     # Fitness Calculation (walls-aware)
     # ------------------------------------------------------------------
+    def fitness_distance_matrix(self):
+        """
+        Walls-aware costs are not Euclidean, so the shortest path lengths
+        between all cities are precomputed (one BFS flood per city) and
+        used in place of the baseline distance matrix. For very many cities
+        they are calculated when needed instead (see World.get_path_length_matrix).
+        """
+        return self.world.get_path_length_matrix()
+
+    def calculate_tour_lengths(self, tours):
+        """
+        Vectorised fitness; tours that use an unreachable edge (np.inf)
+        get UNREACHABLE_PENALTY, as in calculate_fitness().
+        """
+        totals = super().calculate_tour_lengths(tours)
+        totals[np.isinf(totals)] = config.UNREACHABLE_PENALTY
+        return totals
+
+    def calculate_edge_change(self, before, after, edge_positions):
+        """
+        The change is unknown (None) if the mutation made or removed an
+        unreachable edge, as the penalty is not a sum of edge costs.
+        """
+        change = super().calculate_edge_change(before, after, edge_positions)
+        if change is None or not np.isfinite(change):
+            return None
+        return change
+
+    def apply_fitness_change(self, fitness, change):
+        """
+        Penalised (unreachable) tours are re-evaluated after mutation.
+        """
+        if fitness is not None and fitness >= config.UNREACHABLE_PENALTY:
+            return None
+        return super().apply_fitness_change(fitness, change)
+
     def calculate_fitness(self, chromosome):
         """
         Calculates fitness as the sum of shortest traversable path lengths
         between consecutive cities (including return to start).
         """
+        if isinstance(chromosome, np.ndarray) and len(chromosome) >= 2:
+            # index chromosomes are scored from the precomputed path lengths
+            return float(self.calculate_tour_lengths(chromosome[np.newaxis, :])[0])
+
         cities = self.convert_chromosome_to_city_list(chromosome)
         n = len(cities)
 
@@ -190,34 +303,16 @@ class AdvancedGA(BaselineGA):
     # ------------------------------------------------------------------
     # Generation Production
     # ------------------------------------------------------------------
-    def produce_new_generation(self):
+    def select_parent_indices(self, count):
         """
-        Produces a new generation using:
-        - Roulette wheel selection
-        - Ordered one-point crossover (inherited)
-        - Inversion mutation
+        New generations are produced by BaselineGA.produce_new_generation,
+        using roulette wheel selection (or stochastic universal sampling,
+        see config.ROULETTE_SAMPLING), ordered one-point crossover
+        (inherited) and inversion mutation.
         """
-        new_population = []
-
-        while len(new_population) < config.POPULATION_SIZE:
-            parent1 = self.perform_roulette_selection()
-            parent2 = self.perform_roulette_selection()
-
-            child1, child2 = self.perform_crossover(
-                parent1.copy(), parent2.copy()
-            )
-
-            child1 = self.perform_mutation(child1)
-            child2 = self.perform_mutation(child2)
-
-            new_population.append(child1)
-            if len(new_population) < config.POPULATION_SIZE:
-                new_population.append(child2)
-
-        self.population = new_population
-        self.calculate_fitness_of_population()
-
-        return self.best_individual, self.best_fitness
+        if config.ROULETTE_SAMPLING == "sus":
+            return self.stochastic_universal_sampling_indices(count)
+        return self.roulette_selection_indices(count)
 
     # ------------------------------------------------------------------
     # Improved Stopping Condition
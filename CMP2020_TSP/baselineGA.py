@@ -10,8 +10,7 @@
 # Last Modified: 18/08/25
 """
 
-from numpy.random import randint # https://numpy.org/doc/stable/reference/random/generated/numpy.random.randint.html
-from numpy.random import rand    # https://numpy.org/doc/stable/reference/random/generated/numpy.random.rand.html
+import numpy as np
 import random
 
 from abstractGA import AbstractGA
@@ -39,44 +38,82 @@ class BaselineGA(AbstractGA):
     def produce_new_generation(self):
         """
         Create a new generation of the population using:
-        - Tournament selection
-        - Crossover
+        - Tournament selection of every parent at once (see select_parent_indices
+          and tournament_selection_indices)
+        - Crossover (all pairs at once for index chromosomes)
         - Mutation
 
         At the end, replaces the population and updates fitnesses.
         """
 
+        # --- Parent selection ---
+        number_of_pairs = (config.POPULATION_SIZE + 1) // 2
+        parent_indices = self.select_parent_indices(2 * number_of_pairs).tolist()
+        parents = [self.population[i] for i in parent_indices]
+        parents1 = parents[0::2]
+        parents2 = parents[1::2]
+
+        # --- Crossover ---
+        if all(isinstance(parent, np.ndarray) for parent in parents):
+            # index chromosomes: cross every pair of parents in one call
+            length = len(parents[0])
+            crossover_points = self.choose_crossover_points(number_of_pairs, length)
+            offspring1, offspring2 = self.perform_crossover_batch(
+                np.stack(parents1), np.stack(parents2), crossover_points
+            )
+            offspring = np.empty((2 * number_of_pairs, length), dtype=offspring1.dtype)
+            offspring[0::2] = offspring1
+            offspring[1::2] = offspring2
+
+            # offspring that were not crossed are copies of their parent, so have the same fitness
+            crossed = np.repeat(crossover_points < length, 2)
+            inherited_fitnesses = [None if crossed[c] else self.fitnesses[parent_indices[c]]
+                                   for c in range(len(offspring))]
+        else:
+            offspring = []
+            for parent1, parent2 in zip(parents1, parents2):
+                offspring.extend(self.perform_crossover(parent1.copy(), parent2.copy()))
+            inherited_fitnesses = [None] * len(offspring)
+
+        # --- Mutation ---
+        # a mutated copy's fitness is its parent's plus the change in the edges the mutation touched
         new_population = []
-
-        # Until we fill the population:
-        while len(new_population) < config.POPULATION_SIZE:
-
-            # --- Parent selection ---
-            parent1 = self.perform_tournament_selection(3)
-            parent2 = self.perform_tournament_selection(3)
-
-            # --- Crossover ---
-            offspring1, offspring2 = self.perform_crossover(parent1.copy(), parent2.copy())
-
-            # --- Mutation ---
-            offspring1 = self.perform_mutation(offspring1)
-            offspring2 = self.perform_mutation(offspring2)
-
-            # --- Add offspring ---
-            new_population.append(offspring1)
-            if len(new_population) < config.POPULATION_SIZE:
-                new_population.append(offspring2)
+        known_fitnesses = []
+        for child, fitness in zip(offspring[:config.POPULATION_SIZE], inherited_fitnesses):
+            mutant, change = self.perform_mutation_with_change(child)
+            new_population.append(mutant)
+            known_fitnesses.append(self.apply_fitness_change(fitness, change))
 
         # Replace the old population
         self.population = new_population
 
-
-
         # Recalculate fitnesses & update best individual
-        self.calculate_fitness_of_population()
+        self.calculate_fitness_of_population(known_fitnesses)
 
         return self.best_individual, self.best_fitness
 
+    """ Returns the fitness of a mutated copy of a parent with the given fitness, or None
+        if it needs to be evaluated (fitness or change unknown).
+    """
+    def apply_fitness_change(self, fitness, change):
+        if fitness is None or change is None:
+            return None
+        return fitness + change
+
+    """ Creates the initial population as random permutations of the city indices 
+        (rather than shuffling and converting lists of City objects).
+    """
+    def initialise_population(self):
+        number_of_cities = len(self.world.city_table)
+        self.population = [self.rng.permutation(number_of_cities).astype(self.chromosome_dtype())
+                           for _ in range(config.POPULATION_SIZE)]
+
+    """ The selection operator used by produce_new_generation: selects all of the parents 
+        of a generation at once. Returns an array of their indices within self.population.
+    """
+    def select_parent_indices(self, count):
+        return self.tournament_selection_indices(count, 3)
+
 
     """ Sum the distance between each of the cities 
         EDIT THIS: you will need to add the code that calculates the fitness of a single individual/chromosome
@@ -95,10 +132,15 @@ class BaselineGA(AbstractGA):
         """
         Calculate the total distance of a TSP tour.
 
-        The chromosome is a sequence of City objects. Fitness is defined as
-        the total distance travelled when visiting each city in order and
-        returning to the starting city.
+        The chromosome is an array of city indices (see
+        convert_chromosome_to_city_list); a sequence of City objects is also
+        accepted. Fitness is defined as the total distance travelled when
+        visiting each city in order and returning to the starting city.
         """
+        if isinstance(chromosome, np.ndarray):
+            # index chromosomes are scored directly from the distance matrix
+            return float(self.calculate_tour_lengths(chromosome[np.newaxis, :])[0])
+
         cities = self.convert_chromosome_to_city_list(chromosome)
 
         total_distance = 0.0
@@ -113,6 +155,12 @@ class BaselineGA(AbstractGA):
 
         return total_distance
 
+    """ The fitness is the tour length over the World's Euclidean distance matrix, 
+        which lets AbstractGA score the whole population at once.
+    """
+    def fitness_distance_matrix(self):
+        return self.world.get_distance_matrix()
+
     # YOU WILL NEED TO ADD METHODS
 
     """
@@ -130,6 +178,13 @@ class BaselineGA(AbstractGA):
         Randomly selects k individuals from the population and returns
         the one with the best (lowest) fitness.
         """
+        return self.population[self._tournament_selection_index(k)]
+
+    def _tournament_selection_index(self, k):
+        """
+        Returns the index of the winner of a tournament between k randomly
+        selected individuals.
+        """
         # Indices of all individuals
         population_size = len(self.population)
 
@@ -146,8 +201,26 @@ class BaselineGA(AbstractGA):
                 best_fitness = self.fitnesses[idx]
                 best_index = idx
 
-        # Return the winning individual (chromosome)
-        return self.population[best_index]
+        # Return the index of the winning individual (chromosome)
+        return best_index
+
+    def tournament_selection_indices(self, count, k):
+        """
+        Runs `count` k-tournaments at once over the fitness array.
+
+        Each row of a (count x k) array of random contestants is won by the
+        contestant with the lowest fitness, so a whole generation is
+        selected in O(count * k). Unlike perform_tournament_selection(),
+        contestants are drawn with replacement (the same individual may
+        appear twice in a tournament).
+
+        Returns:
+            An array of the indices of the winners.
+        """
+        fitnesses = np.asarray(self.fitnesses, dtype=float)
+        contestants = self.rng.integers(0, len(fitnesses), size=(count, k))
+        winners = np.argmin(fitnesses[contestants], axis=1)
+        return contestants[np.arange(count), winners]
 
     """
         The following function and comments within were generated using an AI tool:
@@ -165,15 +238,27 @@ class BaselineGA(AbstractGA):
         the cities at those positions. Otherwise, return a COPY of the
         individual unchanged.
         """
+        mutant, _ = self.perform_mutation_with_change(individual)
+        return mutant
+
+    def perform_mutation_with_change(self, individual):
+        """
+        Swap mutation that also reports the change in fitness it caused.
+
+        Returns:
+            (mutant, change): change is the difference in the (at most four)
+            edges touched by the swap, 0.0 if no mutation happened, or None
+            if it cannot be calculated from a distance matrix.
+        """
 
         # If no mutation: return a safe copy, NOT the original
         if random.random() > config.MUTATION_RATE:
-            return individual.copy()
+            return individual.copy(), 0.0
 
         # If mutating...
         length = len(individual)
         if length < 2:
-            return individual.copy()
+            return individual.copy(), 0.0
 
         # Make a copy before mutating (avoid corrupting parents)
         mutant = individual.copy()
@@ -181,7 +266,9 @@ class BaselineGA(AbstractGA):
         i, j = random.sample(range(length), 2)
         mutant[i], mutant[j] = mutant[j], mutant[i]
 
-        return mutant
+        # the edges either side of both swapped cities
+        edge_positions = {(i - 1) % length, i, (j - 1) % length, j}
+        return mutant, self.calculate_edge_change(individual, mutant, edge_positions)
 
     """
             The following function and comments within were generated using an AI tool:
@@ -220,20 +307,88 @@ class BaselineGA(AbstractGA):
         # crossover_point = 2
         # to match the example in the brief exactly.
 
-        # Offspring 1: prefix from parent1, then fill from parent2
-        offspring1 = parent1[:crossover_point]
-        for gene in parent2:
-            if gene not in offspring1:
-                offspring1.append(gene)
+        offspring1 = self._ordered_crossover(parent1, parent2, crossover_point)
+        offspring2 = self._ordered_crossover(parent2, parent1, crossover_point)
+
+        return offspring1, offspring2
+
+    def _ordered_crossover(self, prefix_parent, fill_parent, crossover_point):
+        """
+        Returns prefix_parent[:crossover_point] followed by the remaining
+        cities in the order they appear in fill_parent.
+
+        Runs in O(n): the cities already in the prefix are marked in a
+        seen-mask (index chromosomes) or a set of city names (City lists),
+        rather than searching the offspring for every gene.
+        """
+        prefix = prefix_parent[:crossover_point]
+
+        if isinstance(prefix_parent, np.ndarray):
+            seen = np.zeros(len(prefix_parent), dtype=bool)
+            seen[prefix] = True
+            return np.concatenate((prefix, fill_parent[~seen[fill_parent]]))
 
-        # Offspring 2: prefix from parent2, then fill from parent1
-        offspring2 = parent2[:crossover_point]
-        for gene in parent1:
-            if gene not in offspring2:
-                offspring2.append(gene)
+        seen = {city.name for city in prefix}
+        return prefix + [city for city in fill_parent if city.name not in seen]
+
+    def perform_crossover_batch(self, parents1, parents2, crossover_points=None):
+        """
+        Ordered one-point crossover of every pair of parents in one call.
 
+        parents1 and parents2 are (pairs x n) arrays of index chromosomes;
+        row r of each is crossed to give row r of offspring1 and offspring2,
+        with the same children as perform_crossover(). Each pair is crossed
+        with probability CROSSOVER_RATE at a random point (unless
+        crossover_points is given); pairs that are not crossed are copied.
+
+        Returns:
+            (offspring1, offspring2) as (pairs x n) arrays.
+        """
+        number_of_pairs, length = parents1.shape
+        if length < 2:
+            return parents1.copy(), parents2.copy()
+
+        if crossover_points is None:
+            crossover_points = self.choose_crossover_points(number_of_pairs, length)
+        points = np.broadcast_to(crossover_points, (number_of_pairs,))[:, np.newaxis]
+
+        offspring1 = self._ordered_crossover_batch(parents1, parents2, points)
+        offspring2 = self._ordered_crossover_batch(parents2, parents1, points)
         return offspring1, offspring2
 
+    def choose_crossover_points(self, number_of_pairs, length):
+        """
+        Draws a crossover point between 1 and length-1 for each pair of
+        parents; pairs that are not crossed (probability 1 - CROSSOVER_RATE)
+        get the point `length`, so their offspring are copies of the parents.
+        """
+        if length < 2:
+            return np.full(number_of_pairs, length)
+        crossover_points = self.rng.integers(1, length, size=number_of_pairs)
+        crossover_points[self.rng.random(number_of_pairs) > config.CROSSOVER_RATE] = length
+        return crossover_points
+
+    def _ordered_crossover_batch(self, prefix_parents, fill_parents, points):
+        """
+        Row-wise version of _ordered_crossover() using a position table:
+        position[r, city] is where the city appears in prefix_parents[r], so
+        a city of fill_parents[r] belongs after the prefix when its position
+        is at or after the crossover point.
+        """
+        number_of_pairs, length = prefix_parents.shape
+        genes = np.arange(length)
+
+        position = np.empty((number_of_pairs, length), dtype=np.intp)
+        np.put_along_axis(position, prefix_parents.astype(np.intp), genes[np.newaxis, :], axis=1)
+
+        keep_prefix = genes[np.newaxis, :] < points
+        keep_fill = np.take_along_axis(position, fill_parents.astype(np.intp), axis=1) >= points
+
+        # every row keeps exactly n genes, in order: the prefix then the filled cities
+        candidates = np.concatenate((prefix_parents, fill_parents), axis=1)
+        keep = np.concatenate((keep_prefix, keep_fill), axis=1)
+        return candidates[keep].reshape(number_of_pairs, length)
+
 
 
     """ The stopping criteria. When this returns true, the GA will stop producing new generations.
@@ -244,18 +399,30 @@ class BaselineGA(AbstractGA):
     
        
     #-------------------
-    # The below conversion methods do nothing as are chromosome is just a list of cities; however, 
-    #  if you decide to experiment with using a different representation, you may want to edit them.
+    # A chromosome is a NumPy array of city indices (uint16, or uint32 for more than 65536 cities), 
+    #  so selection, crossover, mutation and fitness do not need to copy or compare City objects.
+    #  Cities are only converted back to City objects at the end of run_GA.
+    #  Lists of cities that do not belong to the world (e.g. those built by the tests) are left as they are.
     #   
     
     """ convert a list of cities to a chromosome that can be used by the GA """
     def convert_city_list_to_chromosome(self, cities):        
-        return cities   
+        indices = [city.index for city in cities]
+        if None in indices:
+            return cities
+        return np.array(indices, dtype=self.chromosome_dtype())
         
+    """ the smallest unsigned integer type that can hold every city index """
+    def chromosome_dtype(self):
+        return np.uint16 if len(self.world.city_table) <= 65536 else np.uint32
+
     """ convert a chromosome into a list of cities that can be used by fitness 
          calculation and be returned at the end.
     """
     def convert_chromosome_to_city_list(self, chromosome):
+        if isinstance(chromosome, np.ndarray):
+            cities = self.world.get_cities_by_index()
+            return [cities[i] for i in chromosome]
         return chromosome
     #-------------------
     
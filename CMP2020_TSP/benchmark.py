@@ -0,0 +1,174 @@
+"""
+benchmark.py
+
+Microbenchmarks of the GA operators and pathfinding, at a range of
+problem sizes (numbers of cities).
+
+  python benchmark.py --output baseline.json           # run, and save the results as a baseline
+  python benchmark.py --baseline baseline.json          # run again, and compare with the baseline
+  python benchmark.py --sizes 10 50 500 --threshold 0.2
+
+Each benchmark is timed with timeit (the best of --repeat runs of an
+automatically chosen number of calls) and reported in seconds per call.
+With --baseline, every result that is more than --threshold (a fraction,
+default 0.2 = 20%) slower than the baseline is reported as a regression,
+and the exit status is 1 if there are any.
+
+The world grows with the number of cities (see benchmark_world), so the
+large sizes use the EuclideanDistances and PathLengths objects rather
+than dense matrices (see MAX_DISTANCE_MATRIX_CITIES).
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import sys
+import timeit
+
+import numpy as np
+
+import config
+from world import World
+from baselineGA import BaselineGA
+from advancedGA import AdvancedGA
+from settings import config_values
+
+
+SIZES = [10, 50, 500, 5000, 50000]
+
+# config values used when timing a single crossover or mutation
+OPERATOR_RATES = {"CROSSOVER_RATE": 1.0, "MUTATION_RATE": 1.0}
+
+
+def benchmark_world(number_of_cities, seed=0):
+    """ A world with number_of_cities cities, which fill at most a quarter of its cells. """
+    side = math.ceil(math.sqrt(4 * number_of_cities))
+    with config_values(NUMBER_OF_CITIES=number_of_cities,
+                       WORLD_WIDTH=max(config.WORLD_WIDTH, side),
+                       WORLD_HEIGHT=max(config.WORLD_HEIGHT, side)):
+        return World(seed=seed)
+
+
+def benchmark_ga(ga_class, world):
+    """ A GA with an initial population whose fitness has been calculated. """
+    ga = ga_class(world)
+    ga.initialise_population()
+    ga.calculate_fitness_of_population()
+    return ga
+
+
+def benchmarks(world):
+    """ Yields (name, function) for every benchmark of the world. """
+    baseline = benchmark_ga(BaselineGA, world)
+    # the walls-aware fitness of a whole population needs a BFS flood from every city, which
+    #  is far too slow for the big sizes; the AdvancedGA operators only need the fitnesses to
+    #  select from, and the path lengths of the few cities they change
+    advanced = AdvancedGA(world)
+    advanced.population, advanced.fitnesses = list(baseline.population), list(baseline.fitnesses)
+    parent1, parent2 = baseline.population[0], baseline.population[1]
+    cities = world.get_cities()
+
+    yield "calculate_fitness", lambda: baseline.calculate_fitness(parent1)
+    yield "perform_crossover", lambda: baseline.perform_crossover(parent1, parent2)
+    yield "perform_mutation (swap)", lambda: baseline.perform_mutation(parent1)
+    yield "perform_mutation (inversion)", lambda: advanced.perform_mutation(parent1)
+    yield "tournament_selection", lambda: baseline.tournament_selection_indices(config.POPULATION_SIZE, 3)
+    yield "roulette_selection", lambda: advanced.roulette_selection_indices(config.POPULATION_SIZE)
+    yield "bfs_shortest_path_length", lambda: advanced._bfs_shortest_path_length(cities[0].pose, cities[-1].pose)
+
+    # every generation is produced from the initial population, with an empty fitness cache
+    population, fitnesses = list(baseline.population), list(baseline.fitnesses)
+    def produce_new_generation():
+        baseline.population, baseline.fitnesses = list(population), list(fitnesses)
+        baseline._fitness_cache.clear()
+        baseline.produce_new_generation()
+    yield "produce_new_generation", produce_new_generation
+
+
+def time_call(function, repeat):
+    """ seconds per call: the best of `repeat` timings of an automatically chosen number of calls """
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number
+
+
+def run_benchmarks(sizes=SIZES, repeat=5, seed=0):
+    """
+    Runs every benchmark at every size. Returns {benchmark name: {size: seconds per call}}
+    (sizes are strings, as in the JSON file).
+    """
+    results = {}
+    for size in sizes:
+        random.seed(seed)
+        world = benchmark_world(size, seed)
+        for name, function in benchmarks(world):
+            # the operators are always applied, so that their cost is measured;
+            #  a whole generation uses the configured rates
+            rates = {} if name == "produce_new_generation" else OPERATOR_RATES
+            with config_values(**rates):
+                seconds = time_call(function, repeat)
+            results.setdefault(name, {})[str(size)] = seconds
+            print(f"{name:30} {size:>6} cities  {seconds * 1e6:12.1f} us", flush=True)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """
+    Compares results with baseline (both {name: {size: seconds}}).
+    Returns a list of (name, size, baseline seconds, seconds) for the results
+    that are more than `threshold` slower than the baseline.
+    """
+    regressions = []
+    for name, sizes in results.items():
+        for size, seconds in sizes.items():
+            before = baseline.get(name, {}).get(size)
+            if before is None:
+                continue
+            ratio = seconds / before
+            status = "REGRESSION" if ratio > 1 + threshold else ""
+            print(f"{name:30} {size:>6} cities  {ratio:6.2f}x  {status}")
+            if status:
+                regressions.append((name, size, before, seconds))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmarks of the GA operators and pathfinding.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES, help="numbers of cities")
+    parser.add_argument("--repeat", type=int, default=5, help="timings of each benchmark (the best is kept)")
+    parser.add_argument("--output", default="benchmark_results.json", help="JSON file to save the results to")
+    parser.add_argument("--baseline", default=None, metavar="FILE", help="JSON results to compare with")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="slow-down (fraction) that counts as a regression")
+    args = parser.parse_args()
+
+    # the baseline is read before anything is written, and is never overwritten by the results
+    baseline = None
+    if args.baseline is not None:
+        if os.path.abspath(args.baseline) == os.path.abspath(args.output):
+            parser.error("--output and --baseline are the same file: the results would replace the baseline")
+        with open(args.baseline) as infile:
+            baseline = json.load(infile)["results"]
+
+    results = run_benchmarks(args.sizes, args.repeat)
+    with open(args.output, "w") as outfile:
+        json.dump({
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "population_size": config.POPULATION_SIZE,
+            "results": results,
+        }, outfile, indent=2)
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+        print(f"{len(regressions)} regression(s) over {args.threshold:.0%}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
 """ city.py
 
- The city class.
+ The city class, and the CityTable that stores all of the World's cities.
 
   Written by: Helen Harman
   Last Modified: 18/08/25
@@ -8,17 +8,39 @@
 
 import math
 
+import numpy as np
+
+from pose import Pose
+
+
+""" Returns the name of the city with the provided index: 
+     a, b, ..., z, aa, ab, ..., az, ba, ... (so names stay readable for any number of cities)
+"""
+def city_name(index):
+    name = ""
+    index += 1
+    while index > 0:
+        index, letter = divmod(index - 1, 26)
+        name = chr(97 + letter) + name
+    return name
+
+
 """ Contains the cities that the agent needs to visit. """
 class City():
-    #distances = None # if you are using a search algorithm, you could calculate all the distances 
-                      # between cities upfront and then look-up the distance. (This will speed-up the run time.)
+    __slots__ = ("pose", "name", "index", "text")
+
+    # The distances between all cities are calculated upfront by World.get_distance_matrix(),
+    #  and can be looked-up using each city's index. (This speeds-up the run time.)
 
     """ pose: Pose object
-        name: a single character (each city has a unique name)
+        name: a short string (each city has a unique name, see city_name())
+        index: the position of the city within the World's distance matrix
+               (None for cities that do not belong to a World)
     """
-    def __init__(self, pose, name):
+    def __init__(self, pose, name, index=None):
          self.pose = pose
          self.name = name        
+         self.index = index
          
     #--
     """ set the object used to display the city """
@@ -42,11 +64,45 @@ class City():
         return f"<City name:{self.name}, pose:{self.pose}>"
             
     def __str__(self):
-        return f"[{self.x},{self.y}]"
+        return f"[{self.pose.x},{self.pose.y}]"
         
     def __eq__(self, other):
         return self.name == other.name
+
+    def __hash__(self):
+        return hash(self.name)
         
     #---    
 
-# End of City class    
+# End of City class
+
+
+""" Stores all of the cities of a World as contiguous arrays: the ids (City.index) 
+     and the x and y coordinates. This is shared by the World, the GA and the Environment, 
+     so that large instances take a few bytes per city. City objects are only created 
+     when they are asked for.
+"""
+class CityTable():
+
+    """ xs, ys: the coordinates of the cities, in the order of their id """
+    def __init__(self, xs, ys):
+        self.xs = np.asarray(xs, dtype=np.int32)
+        self.ys = np.asarray(ys, dtype=np.int32)
+        self.ids = np.arange(len(self.xs), dtype=np.uint32)
+        self._cities = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    """ the name of the city with the provided id """
+    def name(self, city_id):
+        return city_name(int(city_id))
+
+    """ the City objects, in the order of their id (created the first time they are needed) """
+    def get_cities(self):
+        if self._cities is None:
+            self._cities = [City(Pose(int(x), int(y)), city_name(i), i)
+                            for i, (x, y) in enumerate(zip(self.xs, self.ys))]
+        return self._cities
+
+# End of CityTable class    
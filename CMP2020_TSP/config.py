@@ -18,20 +18,71 @@ WORLD_HEIGHT = 20
 # number of cites 
 NUMBER_OF_CITIES = 50
 
+# how the cities are placed: "uniform", "clustered" or "grid"
+WORLD_LAYOUT = "uniform"
+# number of cluster centres used by the "clustered" layout
+NUMBER_OF_CLUSTERS = 5
+# seed used to place the cities and walls (None: taken from the random module)
+WORLD_SEED = None
+
 # when performing path planning to calculate fitness,
 #  you may want to add some random walls to the environment by increasing this value:
 NUMBER_OF_WALLS = 0
 
+# number of processes used to calculate the path lengths between all cities (1 = no process pool)
+PATHFINDING_PROCESSES = 1
+
 # GA parameters
 POPULATION_SIZE = 300
 CROSSOVER_RATE = 0.05
 MUTATION_RATE = 0.02
 
+# how the AdvancedGA spins the roulette wheel: "roulette" (one spin per parent)
+#  or "sus" (stochastic universal sampling)
+ROULETTE_SAMPLING = "roulette"
+
 STALL_LIMIT = 30
 UNREACHABLE_PENALTY = 1e9
 
+# above this number of cities, distances are calculated when needed rather than stored in a matrix
+MAX_DISTANCE_MATRIX_CITIES = 5000
+
+# above MAX_DISTANCE_MATRIX_CITIES, the most memory (in MB) used to keep the walls-aware path lengths from
+#  the cities that were looked-up most recently (one row of n path lengths per city)
+PATH_LENGTH_CACHE_MB = 1024
+
+# number of worker processes used to calculate the fitness of the population (1 = no process pool)
+FITNESS_PROCESSES = 1
+
+# island model (island.py): number of islands (worker processes), how often they exchange
+#  individuals, how many individuals each island sends, and who they are sent to ("ring" or "all")
+NUMBER_OF_ISLANDS = 4
+MIGRATION_INTERVAL = 10
+NUMBER_OF_MIGRANTS = 2
+MIGRATION_TOPOLOGY = "ring"
+
+# maximum number of tours whose fitness is remembered by the GA
+FITNESS_CACHE_SIZE = 10000
+
 MAX_NUMBER_OF_GENERATIONS = 1000
 
+# the GA prints its progress every REPORT_EVERY generations
+REPORT_EVERY = 1
+
+# largest size (in pixels) of the display windows; bigger worlds are drawn at a smaller scale (and can be zoomed)
+DISPLAY_WIDTH = 1280
+DISPLAY_HEIGHT = 800
+
+# largest size (in pixels) of the images saved by export.py (tsp.py --image)
+EXPORT_WIDTH = 2048
+EXPORT_HEIGHT = 2048
+
+# above this number of cities, the display draws the tour as a single line (rather than one line per pair of cities)
+DISPLAY_POLYLINE_CITIES = 1000
+
+# record the time spent in each phase of the GA (selection, crossover, ...) in ga.phase_stats
+PHASE_TIMING = False
+
 
 
 
@@ -10,24 +10,48 @@
   Last Modified: 23/08/25
 """
 
+import base64
+import io
+
+import numpy as np
+
 from graphics import *
+from projection import Projection, GRID_MIN_PIXELS, LABEL_MIN_PIXELS
+from export import wall_mask, encode_png
+import config
 
 """ Code for displaying the world. """
 class Environment():
 
-    def __init__(self, world, window_name = "World"):
+    """ polyline: draw the tour as a single line through every city (one canvas item) rather than
+                  one line per pair of cities. Defaults to True when there are more than
+                  DISPLAY_POLYLINE_CITIES cities.
+        width, height: the largest size (in pixels) of the window. Default to DISPLAY_WIDTH and
+                  DISPLAY_HEIGHT.
+
+        The view can be zoomed with the mouse wheel or the + and - keys, moved by dragging with
+        the mouse or with the arrow keys, and reset with the 0 key. Only the part of the world
+        that is in view is drawn.
+    """
+    def __init__(self, world, window_name = "World", polyline = None, width = None, height = None):
         # Make a copy of the world an attribute, so that the graphics
         # have access.
         self.world = world
 
-        # How many pixels the grid if offset in the window
-        self.offset = 10
-        
-        # How many pixels correspond to each coordinate.
-        #
-        # This works with the current images. any smaller and the
-        # images will not fit in the grid.
-        self.magnify = 30
+        # How many pixels the grid if offset in the window (offset), how many pixels correspond
+        # to each coordinate (magnify), and the world coordinates at the top-left corner of the 
+        # grid (viewX, viewY; moved by panning) are kept in a Projection (see projection.py).
+        # magnify is up to 30 (see MAX_FIT_MAGNIFY), but smaller if the whole world would not 
+        # fit in the window.
+        if width is None:
+            width = config.DISPLAY_WIDTH
+        if height is None:
+            height = config.DISPLAY_HEIGHT
+        columns = self.world.max_x + 1
+        rows = self.world.max_y + 1
+        self.projection = Projection.fit(columns, rows, width, height)
+        self.fitMagnify = self.projection.magnify
+        self.maxMagnify = 60
 
         # How big to make "characters" when not using images
         self.cSize = 0.4
@@ -35,21 +59,56 @@ class Environment():
         # How big to make objects when not using images.
         self.oSize = 0.6
 
+        # The city labels are only drawn if each grid square is at least this many pixels wide
+        #  (any smaller and they would overlap), and the grid lines if they are this far apart.
+        self.labelMinPixels = LABEL_MIN_PIXELS
+        self.gridMinPixels = GRID_MIN_PIXELS
+
+        if polyline is None:
+            polyline = len(self.world.get_cities()) > config.DISPLAY_POLYLINE_CITIES
+        self.polyline = polyline
+
         # Setup window and draw objects
-        self.pane = GraphWin(window_name, ((2*self.offset)+((self.world.max_x+1)*self.magnify)), ((2*self.offset)+((self.world.max_y+1)*self.magnify)))
+        self.pane = GraphWin(window_name, *self.projection.size(columns, rows))
         self.pane.setBackground("white")
-        self.drawBoundary()
-        self.drawGrid()
-        
-        self.drawWalls()
-        
-        self.pathLines = []
-        self.drawCities()       
-        
+
+        # the lines of the tour, keyed by the (sorted) names of the cities at either end
+        #  (or, when drawing a polyline, the single line through every city), and the 
+        #  cities of the tour that is drawn
+        self.pathLines = {}
+        self.pathPolyline = None
+        self.pathCities = None
+
+        # the labels that are drawn, keyed by the name of their city: [Text, the counter it shows]
+        self.labels = {}
+
+        self._redrawPending = False
+        self._dragFrom = None
+        self.bindViewControls()
+
+        self.redraw()
 
     #
     # Draw the world
     #
+
+    """ Clears the window and draws everything that is in view, then updates the window once """
+    def redraw(self):
+        self._redrawPending = False
+        with self.pane.batch():
+            self.pane.clear()
+            self.pathLines = {}
+            self.pathPolyline = None
+
+            self.drawBoundary()
+            self.drawGrid()
+            
+            self.drawWalls()
+            
+            self.drawLabels(self.world.get_cities())
+            self.drawPath(self.pathCities if self.pathCities is not None else self.world.get_cities())
+
+    #------
     
     """ Put a box around the world """
     def drawBoundary(self):
@@ -58,32 +117,52 @@ class Environment():
 
     #------
 
-    """ Draw gridlines, to visualise the coordinates. """
+    """ Draw gridlines, to visualise the coordinates (only those in view, and only if they 
+         are far enough apart to be seen). 
+    """
     def drawGrid(self):
+        if self.projection.magnify < self.gridMinPixels:
+            return
+        x0, y0, x1, y1 = self.visibleCells()
         lineColor = "gray77"
-        # Vertical lines
-        vLines = []
-        for i in range(self.world.max_x+1):
-            vLines.append(Line(self.convert(i, 0), self.convert(i, self.world.max_y+1)))
-            vLines[i].setOutline(lineColor)
-        for line in vLines:
-            line.draw(self.pane)
-        # Horizontal lines
-        hLines = []
-        for i in range(self.world.max_y + 1):
-            hLines.append(Line(self.convert(0, i), self.convert(self.world.max_x+1, i)))
-            hLines[i].setOutline(lineColor)
-        for line in hLines:
-            line.draw(self.pane)
+        with self.pane.batch():
+            # Vertical lines
+            for i in range(x0, x1 + 1):
+                line = Line(self.convert(i, y0), self.convert(i, y1))
+                line.setOutline(lineColor)
+                line.draw(self.pane, "grid")
+            # Horizontal lines
+            for i in range(y0, y1 + 1):
+                line = Line(self.convert(x0, i), self.convert(x1, i))
+                line.setOutline(lineColor)
+                line.draw(self.pane, "grid")
     
     #------
     
-    """ Draw walls as black rectangles """
+    """ Draw the walls that are in view as a single image, black where there are walls and 
+         transparent elsewhere, made from the world's occupancy grid in one go (see 
+         export.wall_mask). The walls are one canvas item however many there are.
+    """
     def drawWalls(self):
-        for wall in self.world.get_walls():
-            w = Rectangle(self.convert(wall.x, wall.y), self.convert(wall.x + 1, wall.y + 1)) 
-            w.setFill("black")
-            w.draw(self.pane)
+        # an even size puts the centre of the image (where it is drawn) on a whole pixel
+        width = self.pane.getWidth() + self.pane.getWidth() % 2
+        height = self.pane.getHeight() + self.pane.getHeight() % 2
+        walls = wall_mask(self.world, self.projection, width, height)
+        if not walls.any():
+            return
+        pixels = np.zeros((height, width, 4), dtype=np.uint8)
+        pixels[walls, 3] = 255
+        data = io.BytesIO()
+        encode_png(data, pixels, level=1)
+        image = Image(Point(width / 2, height / 2), data=base64.b64encode(data.getvalue()))
+        image.draw(self.pane, "walls")
+
+    #------
+
+    """ the grid squares that are (at least partly) in view, as the range x0 <= x < x1, y0 <= y < y1 """
+    def visibleCells(self):
+        return self.projection.visibleCells(self.pane.getWidth(), self.pane.getHeight(),
+                                            self.world.max_x + 1, self.world.max_y + 1)
 
     #-------------------------------
 
@@ -91,37 +170,187 @@ class Environment():
     # Draw the cities
     #
 
-    """ Uses a Text object to display the locations of the cities. 
-         Draws lines between the cities to show the path taken to visit them
+    """ Uses a Text object to display the locations of the cities (if the labels are readable
+         at the current scale). Draws lines between the cities to show the path taken to visit them
     """
     def drawCities(self):
-        self.pathLines = []
-        counter = 0
-        for city in self.world.get_cities():
-            city.set_text_object( Text(self.convert2(city.pose.x, city.pose.y), str(city.name) + str(counter)) )
-            city.get_text_object().setSize(18)
-            city.get_text_object().draw(self.pane)
-            
-            # draw lines between the cities
-            if (counter < len(self.world.get_cities())):
-                if (counter < len(self.world.get_cities())-1): # if the agent has not yet reached the last city in the list,
-                    city2 = self.world.cities[counter+1]      # the city the agent is travelling to is the next one in the list
-                else:                                # when the agent has reached the last city in the list, 
-                    city2 = self.world.cities[0] # the agent returns to the first city
-                    
-                self.pathLines.append( Line(self.convertPathPoint(city.pose.x, city.pose.y), self.convertPathPoint(city2.pose.x, city2.pose.y)) )
-                self.pathLines[counter].draw(self.pane)
-            
-            counter = counter + 1
+        cities = self.world.get_cities()
+        with self.pane.batch():
+            self.drawLabels(cities)
+            self.drawPath(cities)
+
+    """ Labels each city that is in view with its name and position in the list of cities 
+         (if the labels are readable at the current scale). 
+    """
+    def drawLabels(self, cities):
+        self.labels = {}
+        if not self.labelsReadable():
+            return
+        x0, y0, x1, y1 = self.visibleCells()
+        with self.pane.batch():
+            counter = 0
+            for city in cities:
+                if x0 <= city.pose.x < x1 and y0 <= city.pose.y < y1:
+                    city.set_text_object( Text(self.convert2(city.pose.x, city.pose.y), str(city.name) + str(counter)) )
+                    city.get_text_object().setSize(max(5, min(18, int(0.6 * self.projection.magnify))))
+                    city.get_text_object().draw(self.pane, "labels")
+                    self.labels[city.name] = [city.get_text_object(), counter]
+                counter = counter + 1
+
+    """ Changes the labels that are drawn to show each city's position in the provided list of 
+         cities (only the labels whose position has changed are re-configured).
+    """
+    def updateLabelCounters(self, cities):
+        if not self.labels:
+            return
+        with self.pane.batch():
+            for counter, city in enumerate(cities):
+                label = self.labels.get(city.name)
+                if label is not None and label[1] != counter:
+                    label[0].setText(str(city.name) + str(counter))
+                    label[1] = counter
+
+    """ are the grid squares big enough for the city labels to be read? """
+    def labelsReadable(self):
+        return self.projection.magnify >= self.labelMinPixels
+
+    #------
+
+    """ Draws lines between the cities to show the path taken to visit them (returning from the
+         last city to the first). Only the lines that are in view and are not already drawn are 
+         added, and the lines of the previous path that are not part of this one are removed, 
+         so a small change to the path is quick to draw. The labels are changed to show the 
+         cities' positions in this path.
+    """
+    def drawPath(self, cities):
+        self.pathCities = cities
+        self.updateLabelCounters(cities)
+        if self.polyline:
+            self.drawPathPolyline(cities)
+            return
+
+        # the agent returns from the last city to the first
+        x0, y0, x1, y1 = self.visibleCells()
+        lines = {((city.name, city2.name) if city.name < city2.name else (city2.name, city.name)): (city, city2)
+                 for city, city2 in zip(cities, cities[1:] + cities[:1])
+                 if (min(city.pose.x, city2.pose.x) < x1 and max(city.pose.x, city2.pose.x) >= x0
+                     and min(city.pose.y, city2.pose.y) < y1 and max(city.pose.y, city2.pose.y) >= y0)}
+
+        # draw all of the changes, then update the window once
+        with self.pane.batch():
+            removed = [edge for edge in self.pathLines if edge not in lines]
+            if len(removed) > len(self.pathLines) // 2:
+                # most of the path has changed: delete all of the lines at once
+                self.pane.clear("path")
+                self.pathLines = {}
+            else:
+                for edge in removed:
+                    self.pathLines.pop(edge).undraw()
+            for edge, (city, city2) in lines.items():
+                if edge not in self.pathLines:
+                    line = Line(self.convertPathPoint(city.pose.x, city.pose.y), self.convertPathPoint(city2.pose.x, city2.pose.y))
+                    line.draw(self.pane, "path")
+                    self.pathLines[edge] = line
+
+    """ Draws the path as a single closed line through every city: one canvas call, however
+         many cities there are (Tk clips the parts that are out of view). Later calls move the 
+         existing line to the new path.
+    """
+    def drawPathPolyline(self, cities):
+        coords = self.convertPathCoords(cities)
+        if self.pathPolyline is None or self.pathPolyline.canvas is None:
+            self.pathPolyline = PolyLine(coords, closed=True)
+            self.pathPolyline.draw(self.pane, "path")
+        else:
+            self.pathPolyline.setCoords(coords)
+
     #------
 
     """ removes the cities and lines between them, and re-draws them. """
     def update(self):
-        for city in self.world.getCities(): 
-            city.get_text_object().undraw()
-        for pathLine in self.pathLines: 
-            pathLine.undraw()
-        self.drawCities()
+        with self.pane.batch():
+            self.pane.clear("labels")
+            self.drawCities()
+
+    #---------------------------
+
+    #
+    # Moving the view
+    #
+
+    """ zoom with the mouse wheel, move the view by dragging with the mouse, and use the keys:
+         arrows to move, + and - to zoom, and 0 to show the whole world again 
+    """
+    def bindViewControls(self):
+        self.pane.bind("<MouseWheel>", self._onWheel)                            # Windows and macOS
+        self.pane.bind("<Button-4>", lambda event: self.zoom(1.25, event.x, event.y)) # X11
+        self.pane.bind("<Button-5>", lambda event: self.zoom(0.8, event.x, event.y))
+        self.pane.bind("<ButtonPress-1>", self._onPress, add="+")
+        self.pane.bind("<B1-Motion>", self._onDrag)
+        self.pane.master.bind("<Key>", self._onKey, add="+")
+
+    """ Zooms in (factor > 1) or out, keeping the point at pixel px, py in the same place """
+    def zoom(self, factor, px, py):
+        magnify = min(self.maxMagnify, max(self.fitMagnify, self.projection.magnify * factor))
+        self.projection.viewX = self.projection.viewX + (px - self.projection.offset) * (1 / self.projection.magnify - 1 / magnify)
+        self.projection.viewY = self.projection.viewY + (py - self.projection.offset) * (1 / self.projection.magnify - 1 / magnify)
+        self.projection.magnify = magnify
+        self.scheduleRedraw()
+
+    """ Moves the view by dx, dy pixels """
+    def pan(self, dx, dy):
+        self.projection.viewX = self.projection.viewX - dx / self.projection.magnify
+        self.projection.viewY = self.projection.viewY - dy / self.projection.magnify
+        self.scheduleRedraw()
+
+    """ Shows the whole world again """
+    def resetView(self):
+        self.projection.magnify = self.fitMagnify
+        self.projection.viewX = 0.0
+        self.projection.viewY = 0.0
+        self.scheduleRedraw()
+
+    """ Redraws the window when Tk is next idle, so that many view changes (e.g. while dragging)
+         only cause one redraw. The view is kept within the world first.
+    """
+    def scheduleRedraw(self):
+        columns = (self.pane.getWidth() - 2*self.projection.offset) / self.projection.magnify
+        rows = (self.pane.getHeight() - 2*self.projection.offset) / self.projection.magnify
+        self.projection.viewX = min(max(self.projection.viewX, 0.0), max(0.0, self.world.max_x + 1 - columns))
+        self.projection.viewY = min(max(self.projection.viewY, 0.0), max(0.0, self.world.max_y + 1 - rows))
+        if not self._redrawPending and not self.pane.isClosed():
+            self._redrawPending = True
+            self.pane.after_idle(self.redraw)
+
+    def _onWheel(self, event):
+        self.zoom(1.25 if event.delta > 0 else 0.8, event.x, event.y)
+
+    def _onPress(self, event):
+        self._dragFrom = (event.x, event.y)
+
+    def _onDrag(self, event):
+        if self._dragFrom is not None:
+            self.pan(event.x - self._dragFrom[0], event.y - self._dragFrom[1])
+        self._dragFrom = (event.x, event.y)
+
+    def _onKey(self, event):
+        step = self.pane.getWidth() / 4
+        centreX = self.pane.getWidth() / 2
+        centreY = self.pane.getHeight() / 2
+        if event.keysym == "Left":
+            self.pan(step, 0)
+        elif event.keysym == "Right":
+            self.pan(-step, 0)
+        elif event.keysym == "Up":
+            self.pan(0, step)
+        elif event.keysym == "Down":
+            self.pan(0, -step)
+        elif event.keysym in ("plus", "equal", "KP_Add"):
+            self.zoom(1.25, centreX, centreY)
+        elif event.keysym in ("minus", "KP_Subtract"):
+            self.zoom(0.8, centreX, centreY)
+        elif event.keysym in ("0", "Home"):
+            self.resetView()
 
     #---------------------------
     
@@ -129,31 +358,31 @@ class Environment():
     # Pose convertion methods
     #
     
-    """ Take x and y coordinates and transform them for using offset and magnify.   
-     This conversion works for the grid lines. 
+    """ Take x and y coordinates and transform them for using offset, magnify and the view
+     (see Projection.convert). This conversion works for the grid lines. 
     """
     def convert(self, x, y):
-        newX = self.offset + (x * self.magnify)
-        newY = self.offset + (y * self.magnify)
-        return Point(newX, newY)
+        return Point(*self.projection.convert(x, y))
 
-    """ Take x and y coordinates and transform them for using offset and magnify.    
-     This conversion works for objects, returning the centre of the
+    """ Take x and y coordinates and transform them for using offset, magnify and the view
+     (see Projection.convert2). This conversion works for objects, returning the centre of the
      relevant grid square.
     """
     def convert2(self, x ,y):
-        newX = (self.offset + 0.5*self.magnify) + (x * self.magnify)
-        newY = (self.offset + 0.5*self.magnify) + (y * self.magnify)
-        return Point(newX, newY)
+        return Point(*self.projection.convert2(x, y))
         
-    """ Take x and y coordinates and transform them for using offset and magnify.
-        This conversion works for the path lines, returning just above the 
-        centre of the relevant grid square.
+    """ Take x and y coordinates and transform them for using offset, magnify and the view
+        (see Projection.convertPathPoint). This conversion works for the path lines, returning 
+        just above the centre of the relevant grid square.
     """
     def convertPathPoint(self, x, y):
-        newX = self.offset + ((x+0.5) * self.magnify)
-        newY = self.offset + ((y+0.1) * self.magnify)
-        return Point(newX, newY)
+        return Point(*self.projection.convertPathPoint(x, y))
+
+    """ The path points (see convertPathPoint) of a list of cities, as one flat list of 
+        coordinates [x1, y1, x2, y2, ...] for drawing a PolyLine.
+    """
+    def convertPathCoords(self, cities):
+        return self.projection.convertPathCoords(cities)
         
         
 ## End of class
@@ -0,0 +1,318 @@
+"""
+export.py
+
+Saves a picture of a world and a tour to an SVG, PPM or PNG file, without
+a display: it does not use graphics (or Tk), so it can be used on machines
+without one, e.g. after  python3 tsp.py --ga advanced --image tour.png
+
+  export_tour(world, solution, "tour.svg")
+
+The picture is laid out in the same way as the Environment window (the
+same Projection, see projection.py): the boundary, the grid lines (if they
+are far enough apart to be seen), the walls, the cities and the tour.
+SVG files label the cities in the same way as the window (if the labels
+are readable); PPM and PNG files mark each city with a dot instead.
+
+The file is written as it is produced, a chunk of the tour (or a band of
+image rows) at a time, so large tours are never held in memory as one
+document; a 100,000-city tour takes a few seconds.
+"""
+
+import struct
+import zlib
+from xml.sax.saxutils import escape
+
+import numpy as np
+
+import config
+from projection import Projection, GRID_MIN_PIXELS, LABEL_MIN_PIXELS
+
+
+# number of cities (or walls, or grid lines) written to an SVG file at a time
+SVG_CHUNK = 10000
+
+# most points sampled along the tour's lines when drawing them into an image at a time
+RASTER_CHUNK = 1 << 20
+
+# number of image rows written to a PPM or PNG file at a time
+ROW_BAND = 256
+
+# colours used in PPM and PNG files (the grid is Tk's "gray77", as in the window)
+WHITE = (255, 255, 255)
+BLACK = (0, 0, 0)
+GRID_COLOUR = (196, 196, 196)
+CITY_COLOUR = (255, 0, 0)
+
+
+def export_tour(world, tour=None, filename="tour.svg", width=None, height=None):
+    """
+    Writes a picture of the world and the tour (a list of cities, which is
+    returned to the first at the end; default: the world's cities in their
+    current order) to filename. The format is chosen by the file extension:
+    .svg, .ppm or .png. The picture shows the whole world in at most
+    width x height pixels (default: config.EXPORT_WIDTH x EXPORT_HEIGHT).
+    """
+    if tour is None:
+        tour = world.get_cities()
+    if width is None:
+        width = config.EXPORT_WIDTH
+    if height is None:
+        height = config.EXPORT_HEIGHT
+
+    writers = {".svg": write_svg, ".ppm": write_ppm, ".png": write_png}
+    extension = filename[filename.rfind("."):].lower() if "." in filename else ""
+    if extension not in writers:
+        raise ValueError(f"unknown image format: {filename!r} (use .svg, .ppm or .png)")
+
+    projection = Projection.fit(world.max_x + 1, world.max_y + 1, width, height)
+    mode = "w" if extension == ".svg" else "wb"
+    with open(filename, mode) as outfile:
+        writers[extension](outfile, world, tour, projection)
+
+
+def tour_positions(tour):
+    """ the x and y coordinates of the cities of the tour, as two numpy arrays """
+    xs = np.fromiter((city.pose.x for city in tour), dtype=np.float64, count=len(tour))
+    ys = np.fromiter((city.pose.y for city in tour), dtype=np.float64, count=len(tour))
+    return xs, ys
+
+
+def wall_runs(world, y0=0, y1=None):
+    """
+    The horizontal runs of walls in rows y0 <= y < y1 of the world's occupancy
+    grid, as three numpy arrays: the row of each run, its first cell and the
+    cell after its last.
+    """
+    if y1 is None:
+        y1 = world.max_y + 1
+    blocked = np.frombuffer(world.blocked, dtype=np.uint8).reshape(world.max_y + 1, world.max_x + 1)[y0:y1]
+    padded = np.zeros((blocked.shape[0], blocked.shape[1] + 2), dtype=np.int8)
+    padded[:, 1:-1] = blocked
+    changes = np.diff(padded, axis=1)
+    rows, starts = np.nonzero(changes == 1)
+    _, ends = np.nonzero(changes == -1)
+    return rows + y0, starts, ends
+
+
+#------------------------------------------------
+#
+# SVG
+#
+
+def write_svg(outfile, world, tour, projection):
+    """ Writes the picture to outfile (a text file) as SVG. """
+    columns, rows = world.max_x + 1, world.max_y + 1
+    width, height = projection.size(columns, rows)
+    outfile.write(f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+                  f'viewBox="0 0 {width} {height}">\n')
+    outfile.write(f'<rect width="{width}" height="{height}" fill="white"/>\n')
+
+    # Grid lines, if they are far enough apart to be seen
+    if projection.magnify >= GRID_MIN_PIXELS:
+        _, top = projection.convert(0, 0)
+        _, bottom = projection.convert(0, rows)
+        xs, _ = projection.convert(np.arange(columns + 1), 0)
+        _write_svg_path(outfile, (f"M{x:.2f} {top:.2f}V{bottom:.2f}" for x in xs), 'stroke="#c4c4c4"')
+        left, _ = projection.convert(0, 0)
+        right, _ = projection.convert(columns, 0)
+        _, ys = projection.convert(0, np.arange(rows + 1))
+        _write_svg_path(outfile, (f"M{left:.2f} {y:.2f}H{right:.2f}" for y in ys), 'stroke="#c4c4c4"')
+
+    # Boundary
+    (left, top), (right, bottom) = projection.convert(0, 0), projection.convert(columns, rows)
+    outfile.write(f'<rect x="{left:.2f}" y="{top:.2f}" width="{right - left:.2f}" height="{bottom - top:.2f}" '
+                  f'fill="none" stroke="black"/>\n')
+
+    # Walls, one rectangle per horizontal run
+    wall_ys, starts, ends = wall_runs(world)
+    lefts, tops = projection.convert(starts, wall_ys)
+    rights, _ = projection.convert(ends, wall_ys)
+    size = projection.magnify
+    _write_svg_path(outfile, (f"M{x:.2f} {y:.2f}h{r - x:.2f}v{size:.2f}h{x - r:.2f}z"
+                              for x, y, r in zip(lefts, tops, rights)), 'fill="black"')
+
+    # City labels (name and position in the tour), if they are readable
+    if projection.magnify >= LABEL_MIN_PIXELS:
+        font_size = max(5, min(18, int(0.6 * projection.magnify)))
+        outfile.write(f'<g font-family="helvetica" font-size="{font_size}" text-anchor="middle" '
+                      f'dominant-baseline="central">\n')
+        for counter, city in enumerate(tour):
+            x, y = projection.convert2(city.pose.x, city.pose.y)
+            outfile.write(f'<text x="{x:.2f}" y="{y:.2f}">{escape(str(city.name))}{counter}</text>\n')
+        outfile.write('</g>\n')
+
+    # The tour, returning from the last city to the first
+    if len(tour) > 0:
+        xs, ys = projection.convertPathPoint(*tour_positions(tour))
+        outfile.write('<polygon fill="none" stroke="black" stroke-linejoin="round" points="')
+        for chunk in range(0, len(xs), SVG_CHUNK):
+            outfile.write(" ".join(f"{x:.2f},{y:.2f}" for x, y in zip(xs[chunk:chunk + SVG_CHUNK],
+                                                                        ys[chunk:chunk + SVG_CHUNK])))
+            outfile.write(" ")
+        outfile.write('"/>\n')
+
+    outfile.write('</svg>\n')
+
+
+def _write_svg_path(outfile, commands, attributes):
+    """ writes a <path> element made of the commands, SVG_CHUNK at a time """
+    outfile.write(f'<path {attributes} d="')
+    chunk = []
+    for command in commands:
+        chunk.append(command)
+        if len(chunk) == SVG_CHUNK:
+            outfile.write("".join(chunk))
+            chunk = []
+    outfile.write("".join(chunk))
+    outfile.write('"/>\n')
+
+
+#------------------------------------------------
+#
+# PPM and PNG
+#
+
+def render_pixels(world, tour, projection):
+    """ The picture as a height x width x 3 numpy array of RGB values. """
+    columns, rows = world.max_x + 1, world.max_y + 1
+    width, height = projection.size(columns, rows)
+    pixels = np.empty((height, width, 3), dtype=np.uint8)
+    pixels[:] = WHITE
+
+    cell_x, cell_y = pixel_cells(projection, width, height, columns, rows)
+    inside_x = np.flatnonzero(cell_x >= 0)
+    inside_y = np.flatnonzero(cell_y >= 0)
+
+    # Grid lines, if they are far enough apart to be seen
+    if projection.magnify >= GRID_MIN_PIXELS and len(inside_x) and len(inside_y):
+        top, bottom = inside_y[0], inside_y[-1] + 1
+        left, right = inside_x[0], inside_x[-1] + 1
+        xs, _ = projection.convert(np.arange(columns + 1), 0)
+        _, ys = projection.convert(0, np.arange(rows + 1))
+        pixels[top:bottom, np.clip(np.rint(xs).astype(np.int64), 0, width - 1)] = GRID_COLOUR
+        pixels[np.clip(np.rint(ys).astype(np.int64), 0, height - 1), left:right] = GRID_COLOUR
+
+    # Walls
+    pixels[wall_mask(world, projection, width, height)] = BLACK
+
+    # Boundary
+    (left, top), (right, bottom) = projection.convert(0, 0), projection.convert(columns, rows)
+    left, top = int(round(left)), int(round(top))
+    right, bottom = min(int(round(right)), width - 1), min(int(round(bottom)), height - 1)
+    pixels[top:bottom + 1, [left, right]] = BLACK
+    pixels[[top, bottom], left:right + 1] = BLACK
+
+    # The tour, returning from the last city to the first, and a dot on each city
+    if len(tour) > 0:
+        xs, ys = projection.convertPathPoint(*tour_positions(tour))
+        xs, ys = xs.astype(np.float32), ys.astype(np.float32)
+        _draw_lines(pixels, xs, ys, np.roll(xs, -1), np.roll(ys, -1), BLACK)
+        dot = max(1, int(projection.magnify / 5))
+        cx, cy = projection.convert2(*tour_positions(tour))
+        cx, cy = np.rint(cx).astype(np.int64), np.rint(cy).astype(np.int64)
+        for dx in range(-(dot // 2), dot - dot // 2):
+            for dy in range(-(dot // 2), dot - dot // 2):
+                _set_pixels(pixels, cx + dx, cy + dy, CITY_COLOUR)
+
+    return pixels
+
+
+def pixel_cells(projection, width, height, columns, rows):
+    """
+    The grid square shown by each of width x height pixels, as two numpy
+    arrays: the x of each column of pixels, and the y of each row (-1 outside
+    a world of columns x rows).
+    """
+    cell_x = np.floor((np.arange(width) + 0.5 - projection.offset) / projection.magnify + projection.viewX).astype(np.int64)
+    cell_y = np.floor((np.arange(height) + 0.5 - projection.offset) / projection.magnify + projection.viewY).astype(np.int64)
+    cell_x[(cell_x < 0) | (cell_x >= columns)] = -1
+    cell_y[(cell_y < 0) | (cell_y >= rows)] = -1
+    return cell_x, cell_y
+
+
+def wall_mask(world, projection, width, height):
+    """
+    Which of width x height pixels show a wall, as a height x width numpy
+    array of bools, looked-up from the world's occupancy grid in one go.
+    """
+    columns, rows = world.max_x + 1, world.max_y + 1
+    cell_x, cell_y = pixel_cells(projection, width, height, columns, rows)
+    blocked = np.frombuffer(world.blocked, dtype=np.uint8).reshape(rows, columns)
+    mask = np.zeros((height, width), dtype=bool)
+    inside_x, inside_y = np.flatnonzero(cell_x >= 0), np.flatnonzero(cell_y >= 0)
+    if len(inside_x) and len(inside_y):
+        # the pixels inside the world are a single rectangle
+        mask[inside_y[0]:inside_y[-1] + 1, inside_x[0]:inside_x[-1] + 1] = blocked[np.ix_(cell_y[inside_y], cell_x[inside_x])]
+    return mask
+
+
+def _draw_lines(pixels, x0, y0, x1, y1, colour):
+    """ draws the lines from (x0[i], y0[i]) to (x1[i], y1[i]), sampling RASTER_CHUNK points at a time """
+    height, width = pixels.shape[:2]
+    # the pixels of the lines are marked in a mask, and coloured at the end in one go
+    mask = np.zeros(height * width, dtype=bool)
+    steps = np.ceil(np.maximum(np.abs(x1 - x0), np.abs(y1 - y0))).astype(np.int64) + 1
+    ends = np.cumsum(steps)
+    first = 0
+    while first < len(steps):
+        # as many lines as will fit in the chunk (and at least one)
+        done = ends[first - 1] if first > 0 else 0
+        last = max(first + 1, int(np.searchsorted(ends, done + RASTER_CHUNK, side="right")))
+        n = steps[first:last]
+        line = np.repeat(np.arange(first, last), n)
+        starts = np.repeat((np.cumsum(n) - n).astype(np.float32), n)
+        t = (np.arange(len(line), dtype=np.float32) - starts) / np.repeat(np.maximum(n - 1, 1).astype(np.float32), n)
+        xs = np.clip(np.rint(x0[line] + t * (x1[line] - x0[line])), 0, width - 1).astype(np.int64)
+        ys = np.clip(np.rint(y0[line] + t * (y1[line] - y0[line])), 0, height - 1).astype(np.int64)
+        mask[ys * width + xs] = True
+        first = last
+    pixels[mask.reshape(height, width)] = colour
+
+
+def _set_pixels(pixels, xs, ys, colour):
+    """ sets the pixels (xs[i], ys[i]) that are within the image to colour """
+    height, width = pixels.shape[:2]
+    inside = (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+    pixels[ys[inside], xs[inside]] = colour
+
+
+def write_ppm(outfile, world, tour, projection):
+    """ Writes the picture to outfile (a binary file) as a binary PPM (P6) image. """
+    pixels = render_pixels(world, tour, projection)
+    height, width = pixels.shape[:2]
+    outfile.write(b"P6\n%d %d\n255\n" % (width, height))
+    for band in range(0, height, ROW_BAND):
+        outfile.write(pixels[band:band + ROW_BAND].tobytes())
+
+
+def write_png(outfile, world, tour, projection):
+    """ Writes the picture to outfile (a binary file) as a PNG image. """
+    encode_png(outfile, render_pixels(world, tour, projection))
+
+
+def encode_png(outfile, pixels, level=6):
+    """
+    Writes pixels (a height x width x 3 (RGB) or x 4 (RGBA) numpy array of
+    uint8) to outfile as a PNG image, compressing ROW_BAND rows at a time
+    (at zlib compression level `level`).
+    """
+    height, width, channels = pixels.shape
+    colour_type = {3: 2, 4: 6}[channels]
+    outfile.write(b"\x89PNG\r\n\x1a\n")
+    _png_chunk(outfile, b"IHDR", struct.pack(">IIBBBBB", width, height, 8, colour_type, 0, 0, 0))
+    compressor = zlib.compressobj(level)
+    for band in range(0, height, ROW_BAND):
+        # each row starts with its filter type (0: none)
+        rows = pixels[band:band + ROW_BAND].reshape(-1, width * channels)
+        data = compressor.compress(np.hstack((np.zeros((len(rows), 1), dtype=np.uint8), rows)).tobytes())
+        if data:
+            _png_chunk(outfile, b"IDAT", data)
+    _png_chunk(outfile, b"IDAT", compressor.flush())
+    _png_chunk(outfile, b"IEND", b"")
+
+
+def _png_chunk(outfile, kind, data):
+    outfile.write(struct.pack(">I", len(data)))
+    outfile.write(kind)
+    outfile.write(data)
+    outfile.write(struct.pack(">I", zlib.crc32(kind + data) & 0xffffffff))
@@ -62,6 +62,16 @@ http://mcsp.wartburg.edu/zelle/python for a quick reference"""
 
 __version__ = "5.0"
 
+# Local modifications (CMP2020_TSP)
+#     * the Tk root is created when it is first needed, not on import
+#     * GraphWin.batch() suspends autoflush while many objects are drawn
+#     * GraphWin keeps its items in a dict (so undraw is O(1)), objects can be
+#       drawn with a tag, and GraphWin.clear(tag) deletes them all at once
+#     * PolyLine: a line through many points (a flat list of coordinates)
+#       that is drawn, or moved to new points, by a single Tk call
+#     * Image(p, data=...) makes an image from image data (e.g. base64 PNG),
+#       and GraphWin.clear releases the images it deletes
+
 # Version 5 8/26/2016
 #     * update at bottom to fix MacOS issue causing askopenfile() to hang
 #     * update takes an optional parameter specifying update rate
@@ -161,6 +171,7 @@ __version__ = "5.0"
 #     Added Entry boxes.
 
 import time, os, sys
+import contextlib
 
 try:  # import as appropriate for 2.x vs. 3.x
    import tkinter as tk
@@ -182,8 +193,17 @@ BAD_OPTION = "Illegal option value"
 ##########################################################################
 # global variables and funtions
 
-_root = tk.Tk()
-_root.withdraw()
+# the Tk root shared by all windows; created by _get_root() when the first
+#  window (or image/entry) needs it, so importing this module does not start Tk
+_root = None
+
+def _get_root():
+    global _root
+    if _root is None:
+        _root = tk.Tk()
+        _root.withdraw()
+        _root.update()
+    return _root
 
 _update_lasttime = time.time()
 
@@ -198,7 +218,7 @@ def update(rate=None):
         else:
             _update_lasttime = now
 
-    _root.update()
+    _get_root().update()
 
 ############################################################################
 # Graphics classes start here
@@ -210,7 +230,7 @@ class GraphWin(tk.Canvas):
     def __init__(self, title="Graphics Window",
                  width=200, height=200, autoflush=True):
         assert type(title) == type(""), "Title must be a string"
-        master = tk.Toplevel(_root)
+        master = tk.Toplevel(_get_root())
         master.protocol("WM_DELETE_WINDOW", self.close)
         tk.Canvas.__init__(self, master, width=width, height=height,
                            highlightthickness=0, bd=0)
@@ -218,7 +238,10 @@ class GraphWin(tk.Canvas):
         self.pack()
         master.resizable(0,0)
         self.foreground = "black"
-        self.items = []
+        # the drawn objects (a dict used as an insertion-ordered set), and
+        #  the objects drawn with each tag
+        self.items = {}
+        self.tagged = {}
         self.mouseX = None
         self.mouseY = None
         self.bind("<Button-1>", self._onClick)
@@ -231,7 +254,7 @@ class GraphWin(tk.Canvas):
         self.closed = False
         master.lift()
         self.lastKey = ""
-        if autoflush: _root.update()
+        if autoflush: _get_root().update()
 
     def __repr__(self):
         if self.isClosed():
@@ -277,13 +300,34 @@ class GraphWin(tk.Canvas):
         return self.closed
 
 
+    @contextlib.contextmanager
+    def batch(self):
+        """Context manager that suspends autoflush, so that many objects
+        can be drawn, undrawn or changed without updating the window after
+        each one; the window is updated once at the end. Batches may be
+        nested.
+
+            with win.batch():
+                for p in points:
+                    Circle(p, 2).draw(win)
+        """
+        autoflush = self.autoflush
+        self.autoflush = False
+        try:
+            yield self
+        finally:
+            self.autoflush = autoflush
+            if autoflush and not self.closed:
+                _get_root().update()
+
+
     def isOpen(self):
         return not self.closed
 
 
     def __autoflush(self):
         if self.autoflush:
-            _root.update()
+            _get_root().update()
 
     
     def plot(self, x, y, color="black"):
@@ -387,13 +431,38 @@ class GraphWin(tk.Canvas):
             self._mouseCallback(Point(e.x, e.y))
 
     def addItem(self, item):
-        self.items.append(item)
+        self.items[item] = None
+        if item.tag is not None:
+            self.tagged.setdefault(item.tag, {})[item] = None
 
     def delItem(self, item):
-        self.items.remove(item)
+        self.items.pop(item, None)
+        if item.tag is not None:
+            self.tagged.get(item.tag, {}).pop(item, None)
+
+    def clear(self, tag=None):
+        """Undraw every object drawn with the given tag (or every object,
+        if tag is None) using a single Tk call."""
+        self.__checkOpen()
+        if tag is None:
+            items = self.items
+            self.delete("all")
+            self.items = {}
+            self.tagged = {}
+        else:
+            items = self.tagged.pop(tag, {})
+            self.delete(tag)
+            for item in items:
+                self.items.pop(item, None)
+        for item in items:
+            item.canvas = None
+            item.id = None
+            if isinstance(item, Image):
+                Image.imageCache.pop(item.imageId, None) # allow gc of tk photoimage
+        self.__autoflush()
 
     def redraw(self):
-        for item in self.items[:]:
+        for item in list(self.items):
             item.undraw()
             item.draw(self)
         self.update()
@@ -453,6 +522,9 @@ class GraphicsObject:
         self.canvas = None
         self.id = None
 
+        # the tag the object is drawn with (see GraphWin.clear)
+        self.tag = None
+
         # config is the dictionary of configuration options for the widget.
         config = {}
         for option in options:
@@ -471,20 +543,26 @@ class GraphicsObject:
         """Set line weight to width"""
         self._reconfig("width", width)
 
-    def draw(self, graphwin):
+    def draw(self, graphwin, tag=None):
 
         """Draw the object in graphwin, which should be a GraphWin
         object.  A GraphicsObject may only be drawn into one
         window. Raises an error if attempt made to draw an object that
-        is already visible."""
+        is already visible. If a tag is provided, the object can be
+        undrawn along with every other object with that tag by
+        graphwin.clear(tag)."""
 
         if self.canvas and not self.canvas.isClosed(): raise GraphicsError(OBJ_ALREADY_DRAWN)
         if graphwin.isClosed(): raise GraphicsError("Can't draw to closed window")
+        if tag is not None:
+            self.tag = tag
         self.canvas = graphwin
         self.id = self._draw(graphwin, self.config)
+        if self.tag is not None:
+            graphwin.addtag_withtag(self.tag, self.id)
         graphwin.addItem(self)
         if graphwin.autoflush:
-            _root.update()
+            _get_root().update()
         return self
 
             
@@ -498,7 +576,7 @@ class GraphicsObject:
             self.canvas.delete(self.id)
             self.canvas.delItem(self)
             if self.canvas.autoflush:
-                _root.update()
+                _get_root().update()
         self.canvas = None
         self.id = None
 
@@ -520,7 +598,7 @@ class GraphicsObject:
                 y = dy
             self.canvas.move(self.id, x, y)
             if canvas.autoflush:
-                _root.update()
+                _get_root().update()
            
     def _reconfig(self, option, setting):
         # Internal method for changing configuration of the object
@@ -533,7 +611,7 @@ class GraphicsObject:
         if self.canvas and not self.canvas.isClosed():
             self.canvas.itemconfig(self.id, options)
             if self.canvas.autoflush:
-                _root.update()
+                _get_root().update()
 
 
     def _draw(self, canvas, options):
@@ -721,6 +799,58 @@ class Polygon(GraphicsObject):
         args.append(options)
         return GraphWin.create_polygon(*args) 
 
+class PolyLine(GraphicsObject):
+
+    """A line through many points, given as one flat list of coordinates
+    [x1, y1, x2, y2, ...] rather than as Point objects, so that even a
+    line through thousands of points is drawn by a single Tk call. If
+    closed is True, the line returns to its first point."""
+    
+    def __init__(self, coords, closed=False):
+        GraphicsObject.__init__(self, ["arrow","fill","width"])
+        self.coords = list(coords)
+        self.closed = closed
+        self.setFill(DEFAULT_CONFIG['outline'])
+        self.setOutline = self.setFill
+
+    def __repr__(self):
+        return "PolyLine({} points)".format(len(self.coords) // 2)
+
+    def clone(self):
+        other = PolyLine(self.coords, self.closed)
+        other.config = self.config.copy()
+        return other
+
+    def getCoords(self):
+        return list(self.coords)
+
+    def setCoords(self, coords):
+        """Move the line to pass through new points (one Tk call if drawn)"""
+        self.coords = list(coords)
+        if self.canvas and not self.canvas.isClosed():
+            self.canvas.coords(self.id, self._screenCoords(self.canvas))
+            if self.canvas.autoflush:
+                _get_root().update()
+
+    def _screenCoords(self, canvas):
+        coords = self.coords
+        if self.closed:
+            coords = coords + coords[:2]
+        if canvas.trans:
+            screen = []
+            for i in range(0, len(coords), 2):
+                screen.extend(canvas.toScreen(coords[i], coords[i+1]))
+            coords = screen
+        return coords
+
+    def _move(self, dx, dy):
+        for i in range(0, len(self.coords), 2):
+            self.coords[i] = self.coords[i] + dx
+            self.coords[i+1] = self.coords[i+1] + dy
+
+    def _draw(self, canvas, options):
+        return canvas.create_line(self._screenCoords(canvas), options)
+
 class Text(GraphicsObject):
     
     def __init__(self, p, text):
@@ -787,7 +917,7 @@ class Entry(GraphicsObject):
         self.anchor = p.clone()
         #print self.anchor
         self.width = width
-        self.text = tk.StringVar(_root)
+        self.text = tk.StringVar(_get_root())
         self.text.set("")
         self.fill = "gray"
         self.color = "black"
@@ -876,16 +1006,18 @@ class Image(GraphicsObject):
     idCount = 0
     imageCache = {} # tk photoimages go here to avoid GC while drawn 
     
-    def __init__(self, p, *pixmap):
+    def __init__(self, p, *pixmap, data=None):
         GraphicsObject.__init__(self, [])
         self.anchor = p.clone()
         self.imageId = Image.idCount
         Image.idCount = Image.idCount + 1
-        if len(pixmap) == 1: # file name provided
-            self.img = tk.PhotoImage(file=pixmap[0], master=_root)
+        if data is not None: # image data (e.g. a base64 encoded PNG) provided
+            self.img = tk.PhotoImage(data=data, master=_get_root())
+        elif len(pixmap) == 1: # file name provided
+            self.img = tk.PhotoImage(file=pixmap[0], master=_get_root())
         else: # width and height provided
             width, height = pixmap
-            self.img = tk.PhotoImage(master=_root, width=width, height=height)
+            self.img = tk.PhotoImage(master=_get_root(), width=width, height=height)
 
     def __repr__(self):
         return "Image({}, {}, {})".format(self.anchor, self.getWidth(), self.getHeight())
@@ -1006,10 +1138,9 @@ def test():
     win.close()
 
 #MacOS fix 2
-#tk.Toplevel(_root).destroy()
+#tk.Toplevel(_get_root()).destroy()
 
-# MacOS fix 1
-update()
+# MacOS fix 1: the root is updated as soon as it is created (see _get_root)
 
 if __name__ == "__main__":
     test()
@@ -0,0 +1,182 @@
+"""
+island.py
+
+Island-model GA: several populations (islands) evolve in parallel, one
+per worker process, using BaselineGA or AdvancedGA. Every
+MIGRATION_INTERVAL generations each island sends copies of its best
+individuals to its neighbours, which replace their worst individuals.
+
+  run_islands(world, AdvancedGA) returns (city_list, fitness), like run_GA.
+
+Migration is asynchronous: an island takes whichever migrants have
+arrived when it migrates, so islands never wait for each other (and an
+island that stops early does not hold up the rest).
+"""
+
+import multiprocessing
+import queue
+import random
+import traceback
+
+import numpy as np
+
+import config
+from reporting import NullReporter
+from settings import config_settings
+
+
+# how long run_islands waits for a result before checking that the islands are still running (seconds)
+RESULT_POLL_SECONDS = 1.0
+
+
+def island_neighbours(island, number_of_islands, topology):
+    """ The islands that `island` sends its migrants to: "ring" (the next island) or "all" (every other island). """
+    if topology == "ring":
+        return [(island + 1) % number_of_islands] if number_of_islands > 1 else []
+    if topology == "all":
+        return [other for other in range(number_of_islands) if other != island]
+    raise ValueError(f"unknown migration topology: {topology!r}")
+
+
+class IslandMigration():
+    """
+    Generation callback that exchanges migrants between islands through
+    multiprocessing queues.
+    """
+
+    def __init__(self, inbox, outboxes, interval, number_of_migrants):
+        self.inbox = inbox
+        self.outboxes = outboxes
+        self.interval = interval
+        self.number_of_migrants = number_of_migrants
+
+    def __call__(self, ga):
+        if ga.number_of_generations % self.interval != 0:
+            return
+
+        # send copies of the best individuals
+        best = np.argsort(ga.fitnesses)[:self.number_of_migrants]
+        migrants = ([ga.population[i] for i in best], [ga.fitnesses[i] for i in best])
+        for outbox in self.outboxes:
+            outbox.put(migrants)
+
+        # take in whatever has arrived
+        while True:
+            try:
+                chromosomes, fitnesses = self.inbox.get_nowait()
+            except queue.Empty:
+                break
+            ga.receive_individuals(chromosomes, fitnesses)
+
+# End of IslandMigration class
+
+
+def _run_island(world, ga_class, settings, island, inboxes, neighbours, interval, number_of_migrants, seed, results):
+    """ Worker process: evolves one island and puts (island, best chromosome, fitness, error) on results. """
+    try:
+        for name, value in settings.items():
+            setattr(config, name, value)
+        random.seed(seed)
+
+        # migrants that are never collected must not stop this process from exiting
+        outboxes = [inboxes[neighbour] for neighbour in neighbours]
+        for outbox in outboxes:
+            outbox.cancel_join_thread()
+
+        ga = ga_class(world)
+        ga.results_file = None
+        ga.reporter = NullReporter()
+        ga.generation_callbacks.append(IslandMigration(inboxes[island], outboxes, interval, number_of_migrants))
+        ga.run_GA()
+        results.put((island, ga.best_individual, ga.best_fitness, None))
+    except Exception:
+        results.put((island, None, None, traceback.format_exc()))
+
+
+def _collect_outcomes(islands, results):
+    """
+    The outcome that each island process puts on results. Waits at most
+    RESULT_POLL_SECONDS at a time, and raises RuntimeError (after stopping
+    the other islands) if a process has exited without reporting, e.g.
+    because it was killed or crashed in native code.
+    """
+    outcomes = {}
+    while len(outcomes) < len(islands):
+        try:
+            outcome = results.get(timeout=RESULT_POLL_SECONDS)
+            outcomes[outcome[0]] = outcome
+            continue
+        except queue.Empty:
+            pass
+        exited = [island for island, process in enumerate(islands)
+                  if island not in outcomes and process.exitcode is not None]
+        if not exited:
+            continue
+        # an island that has just exited may have reported after the wait timed out
+        try:
+            while True:
+                outcome = results.get(timeout=RESULT_POLL_SECONDS)
+                outcomes[outcome[0]] = outcome
+        except queue.Empty:
+            pass
+        exited = [island for island in exited if island not in outcomes]
+        if exited:
+            for process in islands:
+                if process.is_alive():
+                    process.terminate()
+            raise RuntimeError(f"island {exited[0]} exited (exit code {islands[exited[0]].exitcode}) "
+                               f"without reporting its result")
+    return [outcomes[island] for island in range(len(islands))]
+
+
+def run_islands(world, ga_class, number_of_islands=None, migration_interval=None,
+                number_of_migrants=None, topology=None):
+    """
+    Runs `number_of_islands` copies of ga_class on the world, each in its
+    own process with a population of POPULATION_SIZE, exchanging
+    `number_of_migrants` individuals every `migration_interval`
+    generations along the "ring" or "all" (all-to-all) topology.
+    Defaults come from config.
+
+    Returns:
+        (city_list, fitness) of the best individual found by any island.
+    """
+    if number_of_islands is None:
+        number_of_islands = config.NUMBER_OF_ISLANDS
+    if migration_interval is None:
+        migration_interval = config.MIGRATION_INTERVAL
+    if number_of_migrants is None:
+        number_of_migrants = config.NUMBER_OF_MIGRANTS
+    if topology is None:
+        topology = config.MIGRATION_TOPOLOGY
+
+    # calculate the distances once, before the world is copied to the islands
+    ga = ga_class(world)
+    ga.fitness_distance_matrix()
+
+    context = multiprocessing.get_context()
+    inboxes = [context.Queue() for _ in range(number_of_islands)]
+    results = context.Queue()
+    settings = config_settings()
+
+    islands = []
+    for island in range(number_of_islands):
+        neighbours = island_neighbours(island, number_of_islands, topology)
+        process = context.Process(
+            target=_run_island,
+            args=(world, ga_class, settings, island, inboxes, neighbours,
+                  migration_interval, number_of_migrants, random.getrandbits(64), results),
+        )
+        process.start()
+        islands.append(process)
+
+    outcomes = _collect_outcomes(islands, results)
+    for process in islands:
+        process.join()
+
+    errors = [error for _, _, _, error in outcomes if error is not None]
+    if errors:
+        raise RuntimeError("island failed:\n" + errors[0])
+
+    _, chromosome, fitness, _ = min(outcomes, key=lambda outcome: outcome[2])
+    return ga.convert_chromosome_to_city_list(chromosome), fitness
@@ -0,0 +1,92 @@
+"""
+live_view.py
+
+Shows the GA's best tour in an Environment window while the GA runs.
+
+The GA runs in a worker thread. Whenever its best tour improves, a
+TourPublisher (one of the GA's generation callbacks) puts a copy of it
+on a queue. The main thread, which owns Tk, takes the newest tour from
+the queue at most `fps` times a second, and the Environment only redraws
+the path lines that changed (see Environment.drawPath). The GA never
+waits for the display; with 5000 cities a frame takes about 5 ms of
+Python time, so at the default 5 frames a second the GA slows by only a
+few percent.
+
+  display = Environment(world, "Best individual")
+  solution, fitness = run_GA_live(ga, display)
+"""
+
+import queue
+import threading
+import time
+
+
+class TourPublisher():
+    """
+    Generation callback that puts (generation, fitness, chromosome) on
+    `tours` each time the GA's best fitness improves.
+    """
+
+    def __init__(self, tours):
+        self.tours = tours
+        self.best_fitness = None
+
+    def __call__(self, ga):
+        if self.best_fitness is None or ga.best_fitness < self.best_fitness:
+            self.best_fitness = ga.best_fitness
+            self.tours.put((ga.number_of_generations, ga.best_fitness, ga.best_individual.copy()))
+
+# End of TourPublisher class
+
+
+def _newest(tours):
+    """ the last item on the queue (None if it is empty), discarding the others """
+    newest = None
+    while True:
+        try:
+            newest = tours.get_nowait()
+        except queue.Empty:
+            return newest
+
+
+def run_GA_live(ga, environment, fps=5):
+    """
+    Runs ga.run_GA() in a worker thread, showing its best tour in the
+    environment's window (redrawn at most `fps` times a second) until it
+    finishes. Returns the result of run_GA(). Must be called from the
+    thread that created the window.
+    """
+    tours = queue.Queue()
+    publisher = TourPublisher(tours)
+    ga.generation_callbacks.append(publisher)
+
+    outcome = {}
+    def run():
+        try:
+            outcome["result"] = ga.run_GA()
+        except BaseException as error:
+            outcome["error"] = error
+
+    worker = threading.Thread(target=run, daemon=True)
+    worker.start()
+
+    pane = environment.pane
+    title = pane.master.title()
+    frame_time = 1.0 / fps
+    try:
+        while worker.is_alive() or not tours.empty():
+            started = time.perf_counter()
+            newest = _newest(tours)
+            if not pane.isClosed():
+                if newest is not None:
+                    generation, fitness, chromosome = newest
+                    environment.drawPath(ga.convert_chromosome_to_city_list(chromosome))
+                    pane.master.title(f"{title} -- generation {generation}, best fitness {fitness:.2f}")
+                pane.update()
+            worker.join(max(0.0, frame_time - (time.perf_counter() - started)))
+    finally:
+        ga.generation_callbacks.remove(publisher)
+
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["result"]
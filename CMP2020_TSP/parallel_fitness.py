@@ -0,0 +1,81 @@
+"""
+parallel_fitness.py
+
+Scores the population across a pool of worker processes.
+
+The distance matrix is copied once into shared memory when the pool is
+started, and every worker reads it from there, so only the tours (small
+integer arrays) are sent to the workers each generation -- the World and
+City objects are never pickled. The pool is started once per run_GA and
+reused for every generation.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from abstractGA import sum_tour_lengths
+
+
+# the worker's view of the shared distance matrix (set by _attach_matrix)
+_shared = None
+_matrix = None
+
+
+def _attach_matrix(name, shape, dtype):
+    """ Pool initializer: maps the shared distance matrix into the worker. """
+    global _shared, _matrix
+    try:
+        _shared = shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # before Python 3.13 the block is also registered with the (shared) resource
+        #  tracker; the pool's owner unregisters it when it unlinks the block
+        _shared = shared_memory.SharedMemory(name=name)
+    _matrix = np.ndarray(shape, dtype=dtype, buffer=_shared.buf)
+
+
+def _score_chunk(tours):
+    return sum_tour_lengths(_matrix, tours)
+
+
+class ParallelFitnessEvaluator():
+    """
+    Calculates tour lengths over a distance matrix in a pool of
+    `processes` workers. Use as a context manager (or call close()) so the
+    workers and the shared memory are released.
+    """
+
+    def __init__(self, matrix, processes):
+        matrix = np.ascontiguousarray(matrix)
+        self.processes = processes
+
+        self._shared = shared_memory.SharedMemory(create=True, size=max(matrix.nbytes, 1))
+        np.ndarray(matrix.shape, dtype=matrix.dtype, buffer=self._shared.buf)[...] = matrix
+
+        self._pool = ProcessPoolExecutor(
+            max_workers=processes,
+            initializer=_attach_matrix,
+            initargs=(self._shared.name, matrix.shape, matrix.dtype.str),
+        )
+
+    def tour_lengths(self, tours):
+        """
+        Returns the length of every row of a (P x n) array of city indices,
+        exactly as sum_tour_lengths() would calculate them.
+        """
+        chunks = np.array_split(tours, min(self.processes, len(tours)))
+        return np.concatenate(list(self._pool.map(_score_chunk, chunks)))
+
+    def close(self):
+        self._pool.shutdown()
+        self._shared.close()
+        self._shared.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+# End of ParallelFitnessEvaluator class
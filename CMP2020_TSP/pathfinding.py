@@ -0,0 +1,145 @@
+"""
+pathfinding.py
+
+Walls-aware shortest path lengths between every pair of cities.
+
+One breadth-first flood from each city gives the number of moves to every
+other city, so n floods fill the whole (n x n) matrix (rather than one
+BFS per pair of cities). Each flood expands a whole frontier at once over
+a NumPy grid, and the floods can be shared between a pool of processes.
+
+For many cities the matrix would not fit in memory, so PathLengths
+floods from a city only when it is first looked-up, and keeps a limited
+number of rows.
+"""
+
+from collections import OrderedDict
+
+import numpy as np
+
+
+def padded_grid(blocked):
+    """
+    Returns a flattened copy of the (height x width) blocked grid with a
+    border of blocked cells around it, and the row stride of that copy.
+    The border means neighbours never need a bounds check.
+    """
+    height, width = blocked.shape
+    padded = np.ones((height + 2, width + 2), dtype=bool)
+    padded[1:-1, 1:-1] = blocked
+    return padded.ravel(), width + 2
+
+
+def padded_cell(x, y, stride):
+    """ the index of grid cell (x, y) within the flattened padded grid """
+    return (y + 1) * stride + (x + 1)
+
+
+def distance_field(padded, stride, start):
+    """
+    Number of moves (up, down, left, right) from cell `start` to every cell
+    of the flattened padded grid, or -1 where the cell cannot be reached.
+    """
+    offsets = np.array([1, -1, stride, -stride])
+
+    distances = np.full(padded.size, -1, dtype=np.int32)
+    visited = padded.copy()
+    # used to drop repeated cells from the frontier without sorting it
+    slot = np.zeros(padded.size, dtype=np.intp)
+
+    distances[start] = 0
+    visited[start] = True
+    frontier = np.array([start])
+    steps = 0
+
+    while frontier.size:
+        steps += 1
+        neighbours = (frontier[:, np.newaxis] + offsets).ravel()
+        neighbours = neighbours[~visited[neighbours]]
+        positions = np.arange(neighbours.size)
+        slot[neighbours] = positions
+        neighbours = neighbours[slot[neighbours] == positions]
+        visited[neighbours] = True
+        distances[neighbours] = steps
+        frontier = neighbours
+
+    return distances
+
+
+def _path_length_rows(padded, stride, city_cells, starts):
+    """ rows of the path length matrix for the cities in `starts` """
+    rows = np.empty((len(starts), len(city_cells)))
+    for row, start in enumerate(starts):
+        lengths = distance_field(padded, stride, city_cells[start])[city_cells]
+        rows[row] = np.where(lengths < 0, np.inf, lengths)
+    return rows
+
+
+def path_length_matrix(blocked, xs, ys, processes=1):
+    """
+    Returns the (n x n) matrix of shortest path lengths between the cities
+    at (xs[i], ys[i]), moving around the cells marked in `blocked`
+    (a height x width array). Unreachable pairs are np.inf.
+
+    When processes > 1 the floods are spread across a process pool.
+    """
+    padded, stride = padded_grid(np.asarray(blocked, dtype=bool))
+    city_cells = padded_cell(np.asarray(xs), np.asarray(ys), stride)
+    number_of_cities = len(city_cells)
+
+    if processes <= 1 or number_of_cities < 2 * processes:
+        return _path_length_rows(padded, stride, city_cells, range(number_of_cities))
+
+    # imported here, as the process pool machinery is slow to import and rarely needed
+    from concurrent.futures import ProcessPoolExecutor
+
+    chunks = np.array_split(np.arange(number_of_cities), processes)
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        rows = pool.map(_path_length_rows, [padded] * processes, [stride] * processes,
+                        [city_cells] * processes, chunks)
+        return np.vstack(list(rows))
+
+
+class PathLengths():
+    """
+    The shortest path lengths between the cities at (xs[i], ys[i]),
+    calculated when they are looked-up: lengths[a, b] works like
+    path_length_matrix(blocked, xs, ys)[a, b] for arrays of city indices a
+    and b. A city's row is filled by one flood the first time it is
+    looked-up, and the `max_rows` most recently used rows are kept (a row
+    that has been dropped is flooded again when it is next needed).
+    """
+
+    def __init__(self, blocked, xs, ys, max_rows):
+        self.padded, self.stride = padded_grid(np.asarray(blocked, dtype=bool))
+        self.city_cells = padded_cell(np.asarray(xs), np.asarray(ys), self.stride)
+        self.max_rows = max(1, max_rows)
+        self.rows = OrderedDict()
+
+    def row(self, source):
+        """ the path lengths from city `source` to every city """
+        row = self.rows.get(source)
+        if row is None:
+            row = _path_length_rows(self.padded, self.stride, self.city_cells, [source])[0]
+            self.rows[source] = row
+            if len(self.rows) > self.max_rows:
+                self.rows.popitem(last=False)
+        else:
+            self.rows.move_to_end(source)
+        return row
+
+    def __getitem__(self, key):
+        a, b = np.broadcast_arrays(*(np.asarray(index) for index in key))
+        shape = a.shape
+        a, b = a.ravel(), b.ravel()
+        # the look-ups are grouped by their source city, so each row is used once
+        sources, inverse = np.unique(a, return_inverse=True)
+        order = np.argsort(inverse, kind="stable")
+        bounds = np.searchsorted(inverse[order], np.arange(len(sources) + 1))
+        lengths = np.empty(len(a))
+        for group, source in enumerate(sources.tolist()):
+            positions = order[bounds[group]:bounds[group + 1]]
+            lengths[positions] = self.row(source)[b[positions]]
+        return lengths.reshape(shape)
+
+# End of PathLengths class
@@ -0,0 +1,97 @@
+"""
+phase_timing.py
+
+Opt-in timing of the phases of a GA run: selection, crossover, mutation,
+evaluation and the stopping check.
+
+  ga.phase_timing = True      (or set PHASE_TIMING in config)
+  ga.run_GA()
+  print(ga.phase_stats.summary())
+
+The phases are timed by wrapping the GA's methods that make them up (see
+PHASES) for the duration of run_GA, so that a GA that is not being timed
+runs exactly the same code as before. As the phases are found by method
+name, BaselineGA, AdvancedGA and their subclasses are all timed in the
+same way.
+"""
+
+import time
+
+
+# the GA methods that make up each phase
+PHASES = {
+    "selection": ["select_parent_indices"],
+    "crossover": ["choose_crossover_points", "perform_crossover_batch", "perform_crossover"],
+    "mutation": ["perform_mutation_with_change"],
+    "evaluation": ["calculate_fitness_of_population"],
+    "stopping check": ["finished"],
+}
+
+
+class PhaseStats():
+    """
+    The wall time (seconds) spent in each phase: in total, and in each
+    generation (generations[g] is a dict of phase -> seconds spent while
+    ga.number_of_generations was g; generation 0 is the initial population).
+    """
+
+    def __init__(self):
+        self.totals = dict.fromkeys(PHASES, 0.0)
+        self.generations = []
+
+    def add(self, generation, phase, seconds):
+        while len(self.generations) <= generation:
+            self.generations.append(dict.fromkeys(PHASES, 0.0))
+        self.generations[generation][phase] += seconds
+        self.totals[phase] += seconds
+
+    def summary(self):
+        """ a table of the total and mean time per generation of each phase """
+        total = sum(self.totals.values()) or 1.0
+        generations = max(len(self.generations), 1)
+        lines = [f"{'phase':15} {'total (s)':>10} {'per gen (ms)':>13} {'share':>6}"]
+        for phase, seconds in self.totals.items():
+            lines.append(f"{phase:15} {seconds:10.4f} {1000 * seconds / generations:13.4f} {seconds / total:6.1%}")
+        return "\n".join(lines)
+
+# End of PhaseStats class
+
+
+def instrument_phases(ga, stats):
+    """
+    Wraps the methods of each phase of `ga` so that their wall time is
+    added to `stats`. Returns a function that removes the wrappers again.
+    Calls made from inside a timed method (e.g. perform_crossover_batch
+    choosing its own crossover points) are not timed twice.
+    """
+    replaced = {}
+    active = [False]
+
+    def timed(phase, method):
+        def wrapper(*args, **kwargs):
+            if active[0]:
+                return method(*args, **kwargs)
+            active[0] = True
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                stats.add(ga.number_of_generations, phase, time.perf_counter() - start)
+                active[0] = False
+        return wrapper
+
+    for phase, names in PHASES.items():
+        for name in names:
+            if name in vars(ga):
+                replaced[name] = vars(ga)[name]
+            setattr(ga, name, timed(phase, getattr(ga, name)))
+
+    def remove():
+        for names in PHASES.values():
+            for name in names:
+                if name in replaced:
+                    setattr(ga, name, replaced[name])
+                else:
+                    delattr(ga, name)
+
+    return remove
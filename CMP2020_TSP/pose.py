@@ -12,10 +12,11 @@ import math
     
 """ Class to represent the position of elements within the world """
 class Pose():
-    x = 0
-    y = 0
+    __slots__ = ("x", "y")
     
     def __init__(self, *args): 
+        self.x = 0
+        self.y = 0
         if len(args) > 1:
             self.x = args[0]
             self.y = args[1]        
@@ -42,4 +43,8 @@ class Pose():
             return (self.x == other.x and self.y == other.y)
         return False
 
+    def __hash__(self):
+        """Poses that are equal have the same hash, so they can be used in sets and dicts"""
+        return hash((self.x, self.y))
+
 # End of Pose class
@@ -0,0 +1,96 @@
+"""
+projection.py
+
+The conversion from world coordinates to pixels, shared by the display
+(environment.py) and the image export (export.py). It does not use any
+graphics, so it can be used on machines without a display.
+
+A Projection places grid square (x, y) at
+  offset + (x - viewX) * magnify, offset + (y - viewY) * magnify
+pixels, i.e. magnify pixels per grid square, with a margin of offset
+pixels, showing the world from (viewX, viewY) onwards.
+"""
+
+import math
+
+
+# the grid lines are only drawn if they are at least this many pixels apart
+GRID_MIN_PIXELS = 4
+
+# the city labels are only drawn if each grid square is at least this many pixels wide
+#  (any smaller and they would overlap)
+LABEL_MIN_PIXELS = 20
+
+# the most pixels per grid square when the whole world is shown; this works with the current
+#  images (any smaller and the images will not fit in the grid)
+MAX_FIT_MAGNIFY = 30
+
+
+class Projection():
+
+    def __init__(self, offset=10, magnify=MAX_FIT_MAGNIFY, viewX=0.0, viewY=0.0):
+        self.offset = offset
+        self.magnify = magnify
+        self.viewX = viewX
+        self.viewY = viewY
+
+    """ A projection that shows the whole of a world of columns x rows grid squares in at most
+         width x height pixels, at up to MAX_FIT_MAGNIFY pixels per grid square.
+    """
+    @classmethod
+    def fit(cls, columns, rows, width, height, offset=10):
+        magnify = min(MAX_FIT_MAGNIFY, (width - 2*offset) / columns, (height - 2*offset) / rows)
+        return cls(offset, magnify)
+
+    """ The size in pixels (width, height) needed to show the whole of a world of columns x rows """
+    def size(self, columns, rows):
+        return (math.ceil((2*self.offset) + (columns*self.magnify)),
+                math.ceil((2*self.offset) + (rows*self.magnify)))
+
+    """ Take x and y coordinates and transform them for using offset, magnify and the view.
+     This conversion works for the grid lines.
+    """
+    def convert(self, x, y):
+        newX = self.offset + ((x - self.viewX) * self.magnify)
+        newY = self.offset + ((y - self.viewY) * self.magnify)
+        return newX, newY
+
+    """ Take x and y coordinates and transform them for using offset, magnify and the view.
+     This conversion works for objects, returning the centre of the
+     relevant grid square.
+    """
+    def convert2(self, x, y):
+        newX = (self.offset + 0.5*self.magnify) + ((x - self.viewX) * self.magnify)
+        newY = (self.offset + 0.5*self.magnify) + ((y - self.viewY) * self.magnify)
+        return newX, newY
+
+    """ Take x and y coordinates and transform them for using offset, magnify and the view.
+        This conversion works for the path lines, returning just above the
+        centre of the relevant grid square.
+    """
+    def convertPathPoint(self, x, y):
+        newX = self.offset + ((x - self.viewX + 0.5) * self.magnify)
+        newY = self.offset + ((y - self.viewY + 0.1) * self.magnify)
+        return newX, newY
+
+    """ The path points (see convertPathPoint) of a list of cities, as one flat list of
+        coordinates [x1, y1, x2, y2, ...].
+    """
+    def convertPathCoords(self, cities):
+        coords = []
+        for city in cities:
+            coords.extend(self.convertPathPoint(city.pose.x, city.pose.y))
+        return coords
+
+    """ The grid squares that are (at least partly) within width x height pixels, as the
+         range x0 <= x < x1, y0 <= y < y1, limited to a world of columns x rows.
+    """
+    def visibleCells(self, width, height, columns, rows):
+        x0 = self.viewX - self.offset / self.magnify
+        y0 = self.viewY - self.offset / self.magnify
+        x1 = x0 + width / self.magnify
+        y1 = y0 + height / self.magnify
+        return (max(0, int(x0)), max(0, int(y0)),
+                min(columns, math.ceil(x1)), min(rows, math.ceil(y1)))
+
+# End of Projection class
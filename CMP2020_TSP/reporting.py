@@ -0,0 +1,91 @@
+"""
+reporting.py
+
+Progress reporters used by AbstractGA.run_GA.
+
+After every generation run_GA asks its reporter whether it wants that
+generation (reporter.wants(generation)); only if it does is a
+GenerationSnapshot built and passed to reporter.report(). So a reporter
+that prints every N generations does no formatting (or printing) in
+between.
+
+  ga.reporter = NullReporter()                  # silent
+  ga.reporter = PrintReporter(every=50)         # print every 50 generations
+  ga.reporter = ThrottledReporter(seconds=2)    # print at most every 2 seconds
+  ga.reporter = CallbackReporter(my_function)   # my_function(snapshot) every generation
+"""
+
+import time
+from collections import namedtuple
+
+
+""" The state of the GA at the end of a generation. """
+GenerationSnapshot = namedtuple(
+    "GenerationSnapshot",
+    ["generation", "best_fitness", "best_individual", "fitnesses", "elapsed"],
+)
+
+
+class Reporter():
+    """ Base class: reports every generation, and does nothing with it. """
+
+    def wants(self, generation):
+        return True
+
+    def report(self, snapshot):
+        pass
+
+
+class NullReporter(Reporter):
+    """ Reports nothing. """
+
+    def wants(self, generation):
+        return False
+
+
+class PrintReporter(Reporter):
+    """ Prints the best fitness every `every` generations. """
+
+    def __init__(self, every=1):
+        self.every = every
+
+    def wants(self, generation):
+        return generation % self.every == 0
+
+    def report(self, snapshot):
+        print(
+            "number of generations =",
+            snapshot.generation,
+            " best fitness = ",
+            snapshot.best_fitness
+        )
+
+
+class ThrottledReporter(PrintReporter):
+    """ Prints the best fitness at most once every `seconds` seconds. """
+
+    def __init__(self, seconds=1.0):
+        super().__init__()
+        self.seconds = seconds
+        self._next_report = 0.0
+
+    def wants(self, generation):
+        now = time.perf_counter()
+        if now < self._next_report:
+            return False
+        self._next_report = now + self.seconds
+        return True
+
+
+class CallbackReporter(Reporter):
+    """ Calls callback(snapshot) every `every` generations. """
+
+    def __init__(self, callback, every=1):
+        self.callback = callback
+        self.every = every
+
+    def wants(self, generation):
+        return generation % self.every == 0
+
+    def report(self, snapshot):
+        self.callback(snapshot)
@@ -0,0 +1,29 @@
+"""
+settings.py
+
+Helpers for reading and changing the values in config.py: used to copy
+the settings into worker processes (island.py, sweep.py) and to change
+them for a while (benchmark.py, the tests).
+"""
+
+import contextlib
+
+import config
+
+
+def config_settings():
+    """ The current values of the settings in config (so they can be applied in a new process). """
+    return {name: value for name, value in vars(config).items() if name.isupper()}
+
+
+@contextlib.contextmanager
+def config_values(**values):
+    """ temporarily sets config values """
+    previous = {name: getattr(config, name) for name in values}
+    for name, value in values.items():
+        setattr(config, name, value)
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            setattr(config, name, value)
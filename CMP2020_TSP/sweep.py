@@ -0,0 +1,170 @@
+"""
+sweep.py
+
+Runs a parameter sweep: every combination of a grid of config values,
+each repeated for a number of replicates (with its own seed), across a
+pool of worker processes. Every run appends its row to the results file
+(see AbstractGA._append_run_to_csv).
+
+Cells that already have rows in the results file are skipped, so an
+interrupted sweep carries on where it stopped. The file has no seed
+column, so a cell's replicate r counts as done when the file holds more
+than r rows with the same settings. Use a separate results file for each
+GA. For the same reason, only the settings that are recorded in the file
+(RECORDED_SETTINGS) can be swept: cells that differed only in another
+setting could not be told apart, neither when resuming nor in the results.
+
+Example:
+    python sweep.py --set NUMBER_OF_CITIES=10,30,50 --set STALL_LIMIT=5,15,30 --replicates 3
+"""
+
+import argparse
+import ast
+import contextlib
+import csv
+import itertools
+import os
+import random
+import zlib
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import config
+from abstractGA import RESULTS_CSV_HEADER, append_csv_rows
+from settings import config_settings
+from reporting import NullReporter
+
+
+# the config settings recorded in each row of the results file (in column order)
+RECORDED_SETTINGS = ["NUMBER_OF_CITIES", "POPULATION_SIZE", "MAX_NUMBER_OF_GENERATIONS", "STALL_LIMIT", "MUTATION_RATE"]
+
+
+def _csv_value(value):
+    """ a value as it appears in the results file """
+    return "" if value is None else str(value)
+
+
+def settings_key(settings):
+    """ identifies a cell's settings the same way as a row of the results file """
+    return tuple(_csv_value(settings[name]) for name in RECORDED_SETTINGS)
+
+
+def completed_runs(results_file):
+    """ counts the rows of the results file for each settings_key """
+    counts = Counter()
+    if not os.path.isfile(results_file):
+        return counts
+    with open(results_file, newline="") as csvfile:
+        for row in csv.reader(csvfile):
+            if row and row != RESULTS_CSV_HEADER:
+                counts[tuple(row[:len(RECORDED_SETTINGS)])] += 1
+    return counts
+
+
+def sweep_cells(grid, replicates, base_seed=0):
+    """
+    Yields (settings, replicate, seed) for every combination of the grid (a dict of
+    config name -> list of values) and replicate. The seed only depends on
+    the settings, the replicate and base_seed, so it is the same every time
+    the sweep is run.
+    """
+    names = list(grid)
+    for values in itertools.product(*(grid[name] for name in names)):
+        settings = {name: getattr(config, name) for name in RECORDED_SETTINGS}
+        settings.update(zip(names, values))
+        for replicate in range(replicates):
+            seed = zlib.crc32(repr((sorted(settings.items()), replicate, base_seed)).encode())
+            yield settings, replicate, seed
+
+
+def run_cell(ga_name, base_settings, settings, seed, results_file, telemetry_file=None):
+    """ Worker: one GA run with the provided config settings, appending its row to results_file
+        (and its per-generation statistics to telemetry_file, if provided).
+    """
+    from world import World
+    from baselineGA import BaselineGA
+    from advancedGA import AdvancedGA
+    from telemetry import TelemetrySink, TelemetryRecorder
+
+    for name, value in {**base_settings, **settings}.items():
+        setattr(config, name, value)
+    random.seed(seed)
+
+    world = World()
+    ga = (AdvancedGA if ga_name == "advanced" else BaselineGA)(world)
+    ga.results_file = results_file
+    ga.reporter = NullReporter()
+    with contextlib.ExitStack() as stack:
+        if telemetry_file is not None:
+            sink = stack.enter_context(TelemetrySink(telemetry_file))
+            ga.generation_callbacks.append(TelemetryRecorder(sink, f"{ga_name} {settings} seed={seed}"))
+        ga.run_GA()
+    return settings, ga.best_fitness
+
+
+def run_sweep(grid, replicates=1, ga_name="baseline", results_file="ga_results.csv",
+              processes=None, base_seed=0, telemetry_file=None):
+    """
+    Runs every cell of the sweep that is not already in results_file, in a
+    pool of `processes` workers (default: one per CPU). Per-generation
+    statistics are stored in telemetry_file if it is provided.
+    Returns the number of runs that were made. Raises ValueError if the grid
+    has a setting that is not in RECORDED_SETTINGS.
+    """
+    unrecorded = [name for name in grid if name not in RECORDED_SETTINGS]
+    if unrecorded:
+        raise ValueError(f"settings not recorded in the results file cannot be swept: {', '.join(unrecorded)} "
+                         f"(use one of {', '.join(RECORDED_SETTINGS)})")
+
+    # write the header before the workers start appending
+    if not os.path.isfile(results_file):
+        append_csv_rows(results_file, [])
+
+    done = completed_runs(results_file)
+    pending = [(settings, seed) for settings, replicate, seed in sweep_cells(grid, replicates, base_seed)
+               if replicate >= done[settings_key(settings)]]
+    print(f"{len(pending)} runs to do ({results_file})")
+
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        base_settings = config_settings()
+        futures = [pool.submit(run_cell, ga_name, base_settings, settings, seed, results_file, telemetry_file)
+                   for settings, seed in pending]
+        for count, future in enumerate(as_completed(futures), 1):
+            settings, fitness = future.result()
+            print(f"[{count}/{len(pending)}]", settings, "best fitness =", fitness)
+
+    return len(pending)
+
+
+def _parse_setting(text):
+    """ "NAME=v1,v2,..." -> (NAME, [v1, v2, ...]) """
+    name, _, values = text.partition("=")
+    return name.strip(), [ast.literal_eval(value.strip()) for value in values.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a parameter sweep of the GA.")
+    parser.add_argument("--set", action="append", default=[], metavar="NAME=V1,V2,...",
+                        help="config setting and the values to sweep (may be repeated)")
+    parser.add_argument("--replicates", type=int, default=1, help="runs of each combination")
+    parser.add_argument("--ga", choices=["baseline", "advanced"], default="baseline")
+    parser.add_argument("--results", default="ga_results.csv", help="results CSV file")
+    parser.add_argument("--processes", type=int, default=None, help="worker processes (default: CPUs)")
+    parser.add_argument("--seed", type=int, default=0, help="base seed of the replicates")
+    parser.add_argument("--telemetry", default=None, metavar="FILE",
+                        help="SQLite file to store per-generation statistics in")
+    args = parser.parse_args()
+
+    grid = dict(_parse_setting(setting) for setting in args.set)
+    for name in grid:
+        if not hasattr(config, name):
+            parser.error(f"unknown config setting: {name}")
+        if name not in RECORDED_SETTINGS:
+            parser.error(f"{name} is not recorded in the results file, so it cannot be swept "
+                         f"(use one of {', '.join(RECORDED_SETTINGS)})")
+
+    run_sweep(grid, args.replicates, args.ga, args.results, args.processes, args.seed, args.telemetry)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+telemetry.py
+
+Per-generation statistics of GA runs, stored in an SQLite database.
+
+  sink = TelemetrySink("ga_telemetry.sqlite")
+  ga.generation_callbacks.append(TelemetryRecorder(sink, "run-1"))
+  ga.run_GA()
+  sink.close()
+
+Records are buffered in memory and handed to a background thread, which
+writes them in bulk. The database uses write-ahead logging (WAL), so
+many processes (e.g. the workers of a sweep) can write to the same file
+at once.
+
+Table `generations` has one row per generation of each run: run_id,
+generation, best, mean and worst fitness, diversity (the fraction of
+distinct fitness values in the population), the number of fitness
+evaluations so far, and the elapsed time (seconds) since the run started.
+"""
+
+import queue
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+
+class TelemetrySink():
+    """
+    Buffers generation records and writes them to `filename` from a
+    background thread, `batch_size` records at a time. If the writer
+    fails (e.g. the database stays locked, or cannot be opened), its
+    exception is raised by the next flush() or close().
+    """
+
+    def __init__(self, filename="ga_telemetry.sqlite", batch_size=500):
+        self.filename = filename
+        self.batch_size = batch_size
+        self._buffer = []
+        self._batches = queue.Queue()
+        self._error = None
+        self._writer = threading.Thread(target=self._write_batches, daemon=True)
+        self._writer.start()
+
+    def record(self, run_id, generation, best, mean, worst, diversity, evaluations, elapsed):
+        self._buffer.append((run_id, generation, best, mean, worst, diversity, evaluations, elapsed))
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """ hands the buffered records to the writer thread """
+        self._raise_writer_error()
+        if self._buffer:
+            self._batches.put(self._buffer)
+            self._buffer = []
+
+    def close(self):
+        """ writes the remaining records and waits for the writer thread to finish """
+        try:
+            self.flush()
+        finally:
+            self._batches.put(None)
+            self._writer.join()
+        self._raise_writer_error()
+
+    def _raise_writer_error(self):
+        if self._error is not None:
+            raise self._error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _write_batches(self):
+        try:
+            connection = sqlite3.connect(self.filename, timeout=60)
+        except Exception as error:
+            self._error = error
+            return
+        try:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS generations ("
+                " run_id TEXT, generation INTEGER, best REAL, mean REAL, worst REAL,"
+                " diversity REAL, evaluations INTEGER, elapsed REAL)"
+            )
+            connection.commit()
+
+            while True:
+                batch = self._batches.get()
+                if batch is None:
+                    break
+                with connection:
+                    connection.executemany("INSERT INTO generations VALUES (?, ?, ?, ?, ?, ?, ?, ?)", batch)
+        except Exception as error:
+            # kept for flush() and close() to raise; the records that follow are not written
+            self._error = error
+        finally:
+            connection.close()
+
+# End of TelemetrySink class
+
+
+class TelemetryRecorder():
+    """
+    Generation callback (see AbstractGA.generation_callbacks) that records
+    the statistics of each generation of a run in a TelemetrySink.
+    """
+
+    def __init__(self, sink, run_id):
+        self.sink = sink
+        self.run_id = str(run_id)
+
+    def __call__(self, ga):
+        fitnesses = np.asarray(ga.fitnesses, dtype=float)
+        self.sink.record(
+            self.run_id,
+            ga.number_of_generations,
+            float(fitnesses.min()),
+            float(fitnesses.mean()),
+            float(fitnesses.max()),
+            len(np.unique(fitnesses)) / len(fitnesses),
+            ga.number_of_evaluations,
+            time.perf_counter() - ga.start_time,
+        )
+
+# End of TelemetryRecorder class
@@ -7,12 +7,36 @@ To test crossover, set your crossover point to 2 -- make sure you change this ba
 See: https://docs.pytest.org/en/stable/
 """
 
+import csv
+import json
+import multiprocessing
+import os
+import queue
+import sqlite3
+import sys
+import zlib
+
+import numpy as np
 import pytest
 
 import config
 from baselineGA import BaselineGA
+from advancedGA import AdvancedGA
+from abstractGA import sum_tour_lengths, append_csv_rows, RESULTS_CSV_HEADER
+from parallel_fitness import ParallelFitnessEvaluator
+from pathfinding import PathLengths
+from island import run_islands
+from telemetry import TelemetrySink, TelemetryRecorder
+from reporting import CallbackReporter, NullReporter
+from benchmark import compare
+from settings import config_values
+from sweep import run_sweep
+import tsp
+from live_view import TourPublisher
+from export import export_tour, wall_mask
+from projection import Projection
 from world import World
-from city import City
+from city import City, CityTable, city_name
 from pose import Pose
 
     
@@ -109,3 +133,425 @@ def test_fitness():
     assert ga.calculate_fitness(individual) == pytest.approx(13.66, 0.05)      
 
   
+
+def test_vectorised_fitness_matches_calculate_fitness(monkeypatch):
+    monkeypatch.setattr(config, "NUMBER_OF_CITIES", 30)
+    world = World()
+    ga = BaselineGA(world)
+
+    ga.initialise_population()
+    ga.calculate_fitness_of_population()
+
+    assert ga.fitnesses == [ga.calculate_fitness(i) for i in ga.population]
+
+
+def test_crossover_batch(monkeypatch):
+    monkeypatch.setattr(config, "NUMBER_OF_CITIES", 5)
+    world = World()
+    ga = BaselineGA(world)
+
+    # the parents from test_crossover, as city indices (a=0, b=1, ...), crossed at point 2
+    parents1 = np.array([[0, 1, 2, 3, 4], [0, 1, 2, 3, 4]])
+    parents2 = np.array([[1, 4, 3, 0, 2], [1, 4, 3, 0, 2]])
+    offspring1, offspring2 = ga.perform_crossover_batch(parents1, parents2, np.array([2, 5]))
+
+    assert offspring1.tolist() == [[0, 1, 4, 3, 2], [0, 1, 2, 3, 4]]
+    assert offspring2.tolist() == [[1, 4, 0, 2, 3], [1, 4, 3, 0, 2]]
+
+
+def test_mutation_change(monkeypatch):
+    monkeypatch.setattr(config, "MUTATION_RATE", 1)
+    monkeypatch.setattr(config, "NUMBER_OF_CITIES", 8)
+    world = World()
+    ga = BaselineGA(world)
+
+    individual = ga.convert_city_list_to_chromosome(world.get_cities())
+    for _ in range(20):
+        mutant, change = ga.perform_mutation_with_change(individual)
+        assert ga.calculate_fitness(mutant) == pytest.approx(ga.calculate_fitness(individual) + change)
+
+
+def test_city_names():
+    assert [city_name(i) for i in [0, 1, 25, 26, 27, 51, 52, 701, 702]] == \
+        ["a", "b", "z", "aa", "ab", "az", "ba", "zz", "aaa"]
+    assert len({city_name(i) for i in range(5000)}) == 5000
+
+
+def test_pose_equality_and_hash():
+    assert Pose(3, 4) == Pose(3, 4)
+    assert Pose(3, 4) != Pose(4, 3)
+    assert Pose(3, 4) != (3, 4)
+    assert hash(Pose(3, 4)) == hash(Pose(3, 4))
+    assert len({Pose(3, 4), Pose(3, 4), Pose(4, 3)}) == 2
+
+
+def test_city_table_matches_cities():
+    table = CityTable([5, 0, 7, 2], [1, 9, 3, 3])
+    cities = table.get_cities()
+    assert len(table) == 4
+    assert [city.index for city in cities] == table.ids.tolist()
+    assert [city.pose.x for city in cities] == table.xs.tolist()
+    assert [city.pose.y for city in cities] == table.ys.tolist()
+    assert [city.name for city in cities] == [table.name(i) for i in table.ids]
+    # the City objects are only created once
+    assert table.get_cities() is cities
+
+
+def test_canonical_tour_key(monkeypatch):
+    monkeypatch.setattr(config, "NUMBER_OF_CITIES", 5)
+    world = World()
+    ga = BaselineGA(world)
+
+    tour = np.array([2, 0, 4, 1, 3], dtype=np.uint16)
+    key = ga.canonical_tour_key(tour)
+
+    assert ga.canonical_tour_key(np.roll(tour, 2)) == key
+    assert ga.canonical_tour_key(tour[::-1].copy()) == key
+    assert ga.canonical_tour_key(np.array([0, 2, 4, 1, 3], dtype=np.uint16)) != key
+
+
+def test_path_length_matrix_matches_bfs(monkeypatch):
+    monkeypatch.setattr(config, "NUMBER_OF_CITIES", 15)
+    monkeypatch.setattr(config, "NUMBER_OF_WALLS", 200)
+    world = World()
+    ga = AdvancedGA(world)
+
+    cities = world.get_cities()
+    matrix = world.get_path_length_matrix()
+    for a in cities:
+        for b in cities:
+            expected = ga._bfs_shortest_path_length(a.pose, b.pose)
+            assert matrix[a.index, b.index] == (np.inf if expected is None else expected)
+
+
+def test_lazy_path_lengths_match_matrix(monkeypatch):
+    monkeypatch.setattr(config, "NUMBER_OF_CITIES", 30)
+    with config_values(NUMBER_OF_WALLS=200):
+        world = World()
+        matrix = world.get_path_length_matrix()
+        # above MAX_DISTANCE_MATRIX_CITIES, the rows are flooded when they are looked-up
+        with config_values(MAX_DISTANCE_MATRIX_CITIES=10, PATH_LENGTH_CACHE_MB=0):
+            world._path_length_matrix = None
+            lazy = world.get_path_length_matrix()
+    assert isinstance(lazy, PathLengths)
+
+    tours = np.array([np.random.permutation(30) for _ in range(5)])
+    after = np.roll(tours, -1, axis=1)
+    assert np.array_equal(lazy[tours, after], matrix[tours, after])
+    # only the most recently used row is kept
+    assert len(lazy.rows) == 1
+
+
+def test_neighbour_cells_match_get_actions(monkeypatch):
+    monkeypatch.setattr(config, "NUMBER_OF_WALLS", 300)
+    world = World()
+
+    for x in range(world.max_x + 1):
+        for y in range(world.max_y + 1):
+            cells = list(world.neighbour_cells(world.cell_index(x, y)))
+            assert [world.cell_position(cell) for cell in cells] == [(p.x, p.y) for p in world.get_actions(Pose(x, y))]
+
+
+def test_world_layouts(monkeypatch):
+    monkeypatch.setattr(config, "NUMBER_OF_CITIES", 100)
+    monkeypatch.setattr(config, "NUMBER_OF_WALLS", 200)
+
+    for layout in ["uniform", "clustered", "grid"]:
+        world = World(layout, seed=1)
+        cells = [world.cell_index(x, y) for x, y in zip(world.city_table.xs, world.city_table.ys)]
+
+        # every city and wall is in a different cell
+        assert len(set(cells)) == 100
+        assert not any(world.blocked[cell] for cell in cells)
+        assert len(set(world.walls)) == 200
+
+        # the same seed gives the same world
+        assert World(layout, seed=1).city_table.xs.tolist() == world.city_table.xs.tolist()
+
+
+def test_world_layouts_full(monkeypatch):
+    # the cities fill (nearly) all of a 40x20 world
+    monkeypatch.setattr(config, "NUMBER_OF_WALLS", 0)
+    for count in [780, 800]:
+        monkeypatch.setattr(config, "NUMBER_OF_CITIES", count)
+        for layout in ["clustered", "grid"]:
+            world = World(layout, seed=1)
+            cells = world.city_table.ys * world.width + world.city_table.xs
+            assert len(set(cells.tolist())) == count
+
+    # a lattice that is not full still covers the whole world
+    monkeypatch.setattr(config, "NUMBER_OF_CITIES", 60)
+    world = World("grid", seed=1)
+    assert world.city_table.ys.max() >= world.max_y - 2
+    assert world.city_table.xs.max() >= world.max_x - 2
+
+
+def test_batch_selection(monkeypatch):
+    monkeypatch.setattr(config, "NUMBER_OF_CITIES", 5)
+    world = World()
+    ga = AdvancedGA(world)
+    ga.fitnesses = [1.0, 1.0, -1.0, 2.0]
+    ga.population = [None] * 4
+
+    # stochastic universal sampling selects in proportion to 1 / fitness
+    counts = np.bincount(ga.stochastic_universal_sampling_indices(500), minlength=4)
+    assert counts[0] == pytest.approx(200, abs=1)
+    assert counts[1] == pytest.approx(200, abs=1)
+    assert counts[2] == 0
+    assert counts[3] == pytest.approx(100, abs=1)
+
+    assert 2 not in ga.roulette_selection_indices(500)
+
+    # a tournament between every individual is won by the best
+    ga.fitnesses = [3.0, 1.0, 2.0]
+    assert set(ga.tournament_selection_indices(50, 200)) == {1}
+
+
+def test_parallel_fitness_matches_serial(monkeypatch):
+    monkeypatch.setattr(config, "NUMBER_OF_CITIES", 20)
+    world = World()
+    ga = BaselineGA(world)
+    ga.initialise_population()
+    tours = np.stack(ga.population)
+
+    with ParallelFitnessEvaluator(world.get_distance_matrix(), 2) as evaluator:
+        assert evaluator.tour_lengths(tours).tolist() == sum_tour_lengths(world.get_distance_matrix(), tours).tolist()
+
+
+def test_run_islands(monkeypatch):
+    monkeypatch.setattr(config, "NUMBER_OF_CITIES", 10)
+    monkeypatch.setattr(config, "MAX_NUMBER_OF_GENERATIONS", 20)
+    world = World()
+
+    cities, fitness = run_islands(world, BaselineGA, number_of_islands=2, migration_interval=5)
+
+    assert sorted(city.name for city in cities) == sorted(city.name for city in world.get_cities())
+    assert BaselineGA(world).calculate_fitness(cities) == pytest.approx(fitness)
+
+
+class DyingGA(BaselineGA):
+    """ an island that exits without reporting its result (as if it were killed) """
+    def run_GA(self):
+        os._exit(1)
+
+
+def test_run_islands_dead_island(monkeypatch):
+    monkeypatch.setattr(config, "NUMBER_OF_CITIES", 10)
+    world = World()
+    with pytest.raises(RuntimeError, match="without reporting"):
+        run_islands(world, DyingGA, number_of_islands=2)
+
+
+def test_telemetry(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "NUMBER_OF_CITIES", 10)
+    monkeypatch.setattr(config, "MAX_NUMBER_OF_GENERATIONS", 20)
+    world = World()
+    ga = BaselineGA(world)
+    ga.results_file = None
+
+    with TelemetrySink(str(tmp_path / "telemetry.sqlite"), batch_size=7) as sink:
+        ga.generation_callbacks.append(TelemetryRecorder(sink, "run"))
+        ga.run_GA()
+
+    rows = sqlite3.connect(str(tmp_path / "telemetry.sqlite")).execute(
+        "SELECT generation, best, worst FROM generations ORDER BY generation").fetchall()
+    assert [row[0] for row in rows] == list(range(2, 21))
+    assert rows[-1][1] >= ga.best_fitness
+    assert all(best <= worst for _, best, worst in rows)
+
+
+def test_reporters(capsys, monkeypatch):
+    monkeypatch.setattr(config, "NUMBER_OF_CITIES", 10)
+    monkeypatch.setattr(config, "MAX_NUMBER_OF_GENERATIONS", 20)
+    world = World()
+    ga = BaselineGA(world)
+    ga.results_file = None
+
+    ga.reporter = NullReporter()
+    ga.run_GA()
+    assert capsys.readouterr().out == ""
+
+    snapshots = []
+    ga.reporter = CallbackReporter(snapshots.append, every=5)
+    ga.run_GA()
+    assert [snapshot.generation for snapshot in snapshots] == [5, 10, 15, 20]
+    assert snapshots[-1].best_fitness == ga.best_fitness
+
+
+def test_benchmark_compare():
+    baseline = {"calculate_fitness": {"10": 1.0, "50": 2.0}}
+    results = {"calculate_fitness": {"10": 1.05, "50": 3.0, "500": 9.0}}
+    assert compare(results, baseline, 0.1) == [("calculate_fitness", "50", 2.0, 3.0)]
+
+    mutation_rate = config.MUTATION_RATE
+    with config_values(MUTATION_RATE=0.5):
+        assert config.MUTATION_RATE == 0.5
+    assert config.MUTATION_RATE == mutation_rate
+
+
+def test_phase_timing(monkeypatch):
+    monkeypatch.setattr(config, "NUMBER_OF_CITIES", 10)
+    monkeypatch.setattr(config, "MAX_NUMBER_OF_GENERATIONS", 20)
+    world = World()
+    ga = AdvancedGA(world)
+    ga.results_file = None
+    ga.reporter = NullReporter()
+
+    ga.run_GA()
+    assert ga.phase_stats is None
+
+    ga.phase_timing = True
+    ga.run_GA()
+    stats = ga.phase_stats
+    assert len(stats.generations) == ga.number_of_generations + 1
+    assert stats.generations[0]["evaluation"] > 0
+    assert all(seconds > 0 for seconds in stats.totals.values())
+    assert sum(generation["mutation"] for generation in stats.generations) == pytest.approx(stats.totals["mutation"])
+    # the timing wrappers are removed at the end of the run
+    assert "finished" not in vars(ga)
+
+
+def test_batch_cli(tmp_path, monkeypatch):
+    # tsp.main sets these from its arguments; monkeypatch puts them back afterwards
+    for name in ["NUMBER_OF_CITIES", "MAX_NUMBER_OF_GENERATIONS"]:
+        monkeypatch.setattr(config, name, getattr(config, name))
+    output = str(tmp_path / "tour.json")
+    tsp.main(["--ga", "advanced", "--cities", "10", "--generations", "5", "--seed", "1",
+              "--quiet", "--output", output])
+
+    with open(output) as infile:
+        tour = json.load(infile)
+    assert tour["generations"] == 5
+    assert sorted(city["name"] for city in tour["tour"]) == sorted("abcdefghij")
+    # no windows, so Tk is never started
+    assert "graphics" not in sys.modules
+
+
+def test_tour_publisher(monkeypatch):
+    monkeypatch.setattr(config, "NUMBER_OF_CITIES", 10)
+    monkeypatch.setattr(config, "MAX_NUMBER_OF_GENERATIONS", 30)
+    world = World()
+    ga = BaselineGA(world)
+    ga.results_file = None
+    ga.reporter = NullReporter()
+    tours = queue.Queue()
+    ga.generation_callbacks.append(TourPublisher(tours))
+    ga.run_GA()
+
+    published = []
+    while not tours.empty():
+        published.append(tours.get())
+    fitnesses = [fitness for _, fitness, _ in published]
+    assert fitnesses == sorted(set(fitnesses), reverse=True)
+    assert ga.calculate_fitness(published[-1][2]) == pytest.approx(published[-1][1])
+
+
+def test_export_tour(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "NUMBER_OF_CITIES", 10)
+    world = World()
+    cities = world.get_cities()
+    width, height = (2*10) + (world.max_x + 1)*30, (2*10) + (world.max_y + 1)*30
+
+    export_tour(world, cities, str(tmp_path / "tour.svg"))
+    svg = (tmp_path / "tour.svg").read_text()
+    assert svg.startswith(f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}"')
+    assert svg.count("<text") == len(cities)
+    assert svg.rstrip().endswith("</svg>")
+
+    export_tour(world, cities, str(tmp_path / "tour.ppm"))
+    ppm = (tmp_path / "tour.ppm").read_bytes()
+    header = b"P6\n%d %d\n255\n" % (width, height)
+    assert ppm.startswith(header) and len(ppm) == len(header) + width*height*3
+
+    export_tour(world, cities, str(tmp_path / "tour.png"))
+    png = (tmp_path / "tour.png").read_bytes()
+    assert png.startswith(b"\x89PNG\r\n\x1a\n")
+    # the image rows (each with a filter byte) are the same as the PPM's
+    idat = b""
+    position = 8
+    while position < len(png):
+        length = int.from_bytes(png[position:position + 4], "big")
+        if png[position + 4:position + 8] == b"IDAT":
+            idat += png[position + 8:position + 8 + length]
+        position += length + 12
+    rows = np.frombuffer(zlib.decompress(idat), dtype=np.uint8).reshape(height, 1 + width*3)
+    assert rows[:, 1:].tobytes() == ppm[len(header):]
+
+    with pytest.raises(ValueError):
+        export_tour(world, cities, str(tmp_path / "tour.gif"))
+    assert "graphics" not in sys.modules
+
+
+def test_wall_mask(monkeypatch):
+    monkeypatch.setattr(config, "NUMBER_OF_CITIES", 10)
+    monkeypatch.setattr(config, "NUMBER_OF_WALLS", 25)
+    world = World()
+    projection = Projection.fit(world.max_x + 1, world.max_y + 1, 1280, 800)
+    walls = wall_mask(world, projection, 1220, 620)
+    # each wall covers a whole grid square of 30 x 30 pixels
+    assert walls.sum() == 25 * 30 * 30
+    x, y = world.cell_position(world.blocked.find(1))
+    left, top = projection.convert(x, y)
+    assert walls[int(top):int(top) + 30, int(left):int(left) + 30].all()
+
+
+def test_sweep_resumes(tmp_path):
+    results_file = str(tmp_path / "results.csv")
+    with config_values(MAX_NUMBER_OF_GENERATIONS=3):
+        assert run_sweep({"NUMBER_OF_CITIES": [5, 6]}, replicates=2, results_file=results_file, processes=2) == 4
+        # the cells that are already in the results file are skipped
+        assert run_sweep({"NUMBER_OF_CITIES": [5, 6]}, replicates=2, results_file=results_file, processes=2) == 0
+        assert run_sweep({"NUMBER_OF_CITIES": [5, 6, 7]}, replicates=3, results_file=results_file, processes=2) == 5
+
+    with open(results_file, newline="") as csvfile:
+        rows = list(csv.reader(csvfile))
+    assert rows[0] == RESULTS_CSV_HEADER
+    assert sorted(row[0] for row in rows[1:]) == ["5"] * 3 + ["6"] * 3 + ["7"] * 3
+
+
+def test_sweep_rejects_unrecorded_settings(tmp_path):
+    # CROSSOVER_RATE is not a column of the results file, so its cells could not be told apart
+    with pytest.raises(ValueError):
+        run_sweep({"CROSSOVER_RATE": [0.05, 0.5]}, results_file=str(tmp_path / "results.csv"))
+    assert not (tmp_path / "results.csv").exists()
+
+
+def test_euclidean_distances():
+    # a big world with few cities: the distances are looked-up lazily, and match City.distance_to
+    with config_values(NUMBER_OF_CITIES=20, WORLD_WIDTH=2000, WORLD_HEIGHT=2000, MAX_DISTANCE_MATRIX_CITIES=0):
+        world = World(seed=1)
+        distances = world.get_distance_matrix()
+        cities = world.get_cities_by_index()
+        ids = np.array([city.index for city in cities])
+        table = distances[ids[:, None], ids[None, :]]
+        assert table.tolist() == [[city.distance_to(city2, world) for city2 in cities] for city in cities]
+
+
+def test_telemetry_writer_error(tmp_path):
+    # the database cannot be created in a directory that does not exist
+    sink = TelemetrySink(str(tmp_path / "missing" / "telemetry.sqlite"))
+    sink.record("run", 0, 1.0, 1.0, 1.0, 1.0, 1, 0.0)
+    with pytest.raises(sqlite3.OperationalError):
+        sink.close()
+
+
+def _append_result_rows(filename, process):
+    for row in range(20):
+        append_csv_rows(filename, [[process, row]])
+
+
+def test_concurrent_csv_rows_have_one_header(tmp_path):
+    filename = str(tmp_path / "results.csv")
+    processes = [multiprocessing.Process(target=_append_result_rows, args=(filename, process))
+                 for process in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    with open(filename, newline="") as csvfile:
+        rows = list(csv.reader(csvfile))
+    assert rows[0] == RESULTS_CSV_HEADER
+    assert RESULTS_CSV_HEADER not in rows[1:]
+    assert sorted(rows[1:]) == sorted([str(process), str(row)] for process in range(4) for row in range(20))
+    assert [path.name for path in tmp_path.iterdir()] == ["results.csv"]
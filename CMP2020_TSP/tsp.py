@@ -1,27 +1,40 @@
-
 """  tsp.py
 #
 # Displays the initial environment, runs the GA then displays the GA's result.
 #
 # run this using:
-# python3 tsp.py  OR  python tsp.py  
+# python3 tsp.py  OR  python tsp.py
+#
+# or, without any prompts or windows (e.g. on a machine without a display):
+# python3 tsp.py --ga advanced --cities 100 --seed 1 --output tour.json --image tour.png
 #
 # Written by: Helen Harman based on code by Simon Parsons
 # Last Modified: 18/08/25
 """
 
+import argparse
+import json
+import random
+
+import config
 from world import World
-from baselineGA  import *
-from advancedGA import *
-from environment import Environment
+from baselineGA import BaselineGA
+from advancedGA import AdvancedGA
+from reporting import NullReporter, PrintReporter
+
+
+GA_CLASSES = {"baseline": BaselineGA, "advanced": AdvancedGA}
+
 
-import time
+def run_interactive():
+    # graphics starts Tk, so it is only imported when windows are shown
+    from environment import Environment
+    from live_view import run_GA_live
 
-def main():
     random.seed(42) # for reproducibility during testing
     world = World()
     # show cities in the random order they were created in
-    display = Environment(world, "world -- cities in random order")  
+    display = Environment(world, "world -- cities in random order")
     random.seed() # reset the random seed for GA randomness
 
     GAChoice = input("Enter B for Baseline GA, A for Advanced GA: ").strip().upper()
@@ -30,17 +43,91 @@ def main():
         ga = AdvancedGA(world)
     elif GAChoice == 'B':
         ga = BaselineGA(world) # <-- if you write multiple different GAs to compare, you can modify this line to test them out
-    solution, fitness = ga.run_GA()
-    
+    # show the best individual while the GA runs
+    display_solution = Environment(world, "Best individual")
+    solution, fitness = run_GA_live(ga, display_solution)
+
     # show cities in the order provided by the GA
     world.update_world(solution)
     print("Locations to visit: ", solution, " Fitness:", fitness)
-    display_solution = Environment(world, "Best individual")
-        
+    display_solution.update()
 
-if __name__ == "__main__":
-    main()    
     input("Press the Enter key to end program.")
-        
 
 
+def run_batch(args):
+    """ Runs one GA without any prompts, and only opens a window if args.show is set. """
+    for name, value in [("NUMBER_OF_CITIES", args.cities), ("WORLD_WIDTH", args.width),
+                        ("WORLD_HEIGHT", args.height), ("NUMBER_OF_WALLS", args.walls),
+                        ("MAX_NUMBER_OF_GENERATIONS", args.generations), ("WORLD_SEED", args.world_seed)]:
+        if value is not None:
+            setattr(config, name, value)
+
+    random.seed(args.seed)
+    try:
+        world = World()
+    except ValueError as error:
+        raise SystemExit(f"tsp.py: {error}")
+    ga = GA_CLASSES[args.ga](world)
+    ga.results_file = args.results
+    ga.reporter = NullReporter() if args.quiet else PrintReporter(args.report_every)
+
+    if args.show:
+        from environment import Environment
+        from live_view import run_GA_live
+        display_solution = Environment(world, "Best individual")
+        solution, fitness = run_GA_live(ga, display_solution)
+    else:
+        solution, fitness = ga.run_GA()
+    print("best fitness =", fitness, "after", ga.number_of_generations, "generations")
+
+    if args.output is not None:
+        with open(args.output, "w") as outfile:
+            json.dump({
+                "ga": args.ga,
+                "seed": args.seed,
+                "fitness": fitness,
+                "generations": ga.number_of_generations,
+                "tour": [{"name": city.name, "x": city.pose.x, "y": city.pose.y} for city in solution],
+            }, outfile, indent=1)
+
+    if args.image is not None:
+        # only imported when it is needed, so that tsp.py starts quickly
+        from export import export_tour
+        export_tour(world, solution, args.image)
+
+    if args.show:
+        world.update_world(solution)
+        display_solution.update()
+        input("Press the Enter key to end program.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Solve the TSP with a GA. Without --ga, runs interactively with windows.")
+    parser.add_argument("--ga", choices=sorted(GA_CLASSES), help="run this GA without prompts or windows")
+    parser.add_argument("--cities", type=int, help="number of cities (default: config.NUMBER_OF_CITIES)")
+    parser.add_argument("--width", type=int, help="world width (default: config.WORLD_WIDTH)")
+    parser.add_argument("--height", type=int, help="world height (default: config.WORLD_HEIGHT)")
+    parser.add_argument("--walls", type=int, help="number of walls (default: config.NUMBER_OF_WALLS)")
+    parser.add_argument("--generations", type=int, help="maximum number of generations")
+    parser.add_argument("--seed", type=int, help="seed of the world and the GA (default: random)")
+    parser.add_argument("--world-seed", type=int, help="seed of the world only (default: --seed)")
+    parser.add_argument("--output", metavar="FILE", help="JSON file to write the best tour to")
+    parser.add_argument("--image", metavar="FILE", help="SVG, PPM or PNG file to save a picture of the best tour to")
+    parser.add_argument("--results", metavar="FILE", help="CSV file to append the run's results to")
+    parser.add_argument("--report-every", type=int, default=config.REPORT_EVERY,
+                        help="print the progress every N generations")
+    parser.add_argument("--quiet", action="store_true", help="do not print the progress")
+    parser.add_argument("--show", action="store_true", help="display the best tour in a window while the GA runs")
+    args = parser.parse_args(argv)
+
+    if args.ga is None:
+        run_interactive()
+        return
+
+    run_batch(args)
+
+
+if __name__ == "__main__":
+    main()
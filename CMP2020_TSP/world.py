@@ -7,61 +7,205 @@
   Last Modified: 01/02/24
 """
 
+import math
 import random
+
+import numpy as np
+
 import config
 from pose import Pose
-from city import City
+from city import CityTable
+import pathfinding
 
 """ Keeps track of the position of all the objects. """
 class World():
 
-    def __init__(self):
+    """ layout: how the cities are placed -- "uniform" (random cells), "clustered" (random cells
+                around NUMBER_OF_CLUSTERS random centres) or "grid" (an evenly spaced lattice).
+                Defaults to config.WORLD_LAYOUT.
+        seed: seed for the random placement of the cities and walls. Defaults to config.WORLD_SEED; 
+              if that is None, the seed is taken from the random module (so random.seed() still 
+              gives the same world).
+    """
+    def __init__(self, layout=None, seed=None):
 
         # Import boundaries of the world. because we index from 0,
         # these are one less than the number of rows and columns.
         self.max_x = config.WORLD_WIDTH - 1
         self.max_y = config.WORLD_HEIGHT - 1
+        self.width = self.max_x + 1
+        self.height = self.max_y + 1
+
+        number_of_cells = self.width * self.height
+        if config.NUMBER_OF_CITIES + config.NUMBER_OF_WALLS > number_of_cells:
+            raise ValueError(f"{config.NUMBER_OF_CITIES} cities and {config.NUMBER_OF_WALLS} walls "
+                             f"do not fit in a {self.width}x{self.height} world")
+
+        if layout is None:
+            layout = config.WORLD_LAYOUT
+        if seed is None:
+            seed = config.WORLD_SEED if config.WORLD_SEED is not None else random.getrandbits(64)
+        rng = np.random.default_rng(seed)
 
-        self.occupied_locations = [] # so that two cities/walls don't get placed in the same location
+        # Cities and walls are placed in distinct cells, sampled without replacement 
+        #  (rather than re-trying random cells until an unoccupied one is found).
+        #  Cells are numbered row by row (see cell_index).
+        city_cells, wall_cells = self._place_cities_and_walls(layout, rng)
+
+        # so that two cities/walls don't get placed in the same location (one byte per cell)
+        self.occupied = bytearray(number_of_cells)
+        occupied = np.frombuffer(self.occupied, dtype=np.uint8)
+        occupied[city_cells] = 1
+        occupied[wall_cells] = 1
      
         # if you use path planning, you may want to add some walls to the world
         #  Walls are added to random locations. 
-        self.walls = []  #list of Pose objects
-        for i in range(config.NUMBER_OF_WALLS):
-            self.walls.append(self.make_new_unoccupied_pose())
+        self.walls = [Pose(int(x), int(y)) for x, y in zip(wall_cells % self.width, wall_cells // self.width)]
+
+        # occupancy grid of the walls: one byte per cell, 1 if the cell contains a wall. 
+        #  Path planning can check and expand a cell in constant time without creating Pose objects.
+        self.blocked = bytearray(number_of_cells)
+        np.frombuffer(self.blocked, dtype=np.uint8)[wall_cells] = 1
                  
-        # Create cities in random locations      
-        self.cities = []
-        for i in range(config.NUMBER_OF_CITIES):            
-            self.cities.append(City(self.make_new_unoccupied_pose(), chr(97+i)))
+        # The cities are stored in a CityTable (arrays of ids and coordinates);
+        #  City objects are only created when get_cities() is first called.
+        self.city_table = CityTable(city_cells % self.width, city_cells // self.width)
+        self.cities = None
+
+        # distances between every pair of cities, built on first use
+        self._distance_matrix = None
+        self._path_length_matrix = None
 
     #--------------------------------------------------            
          
-    """ returns a Pose within the environment that is not within occupied_locations
-         adds that location to occupied_locations
+    """ returns the cells (as arrays of cell numbers) of NUMBER_OF_CITIES cities, placed using the
+         provided layout, and NUMBER_OF_WALLS walls placed in random unoccupied cells.
     """
-    def make_new_unoccupied_pose(self):
-        newLoc = Pose(random.randint(0, self.max_x), random.randint(0, self.max_y))
-        while newLoc in self.occupied_locations:
-            newLoc = Pose(random.randint(0, self.max_x), random.randint(0, self.max_y))
-        
-        self.occupied_locations.append(newLoc)
-        return newLoc
-        
+    def _place_cities_and_walls(self, layout, rng):
+        number_of_cells = self.width * self.height
+
+        if layout == "uniform":
+            cells = rng.choice(number_of_cells, config.NUMBER_OF_CITIES + config.NUMBER_OF_WALLS, replace=False)
+            return cells[:config.NUMBER_OF_CITIES], cells[config.NUMBER_OF_CITIES:]
+
+        if layout == "clustered":
+            city_cells = self._clustered_cells(config.NUMBER_OF_CITIES, rng)
+        elif layout == "grid":
+            city_cells = self._grid_cells(config.NUMBER_OF_CITIES)
+        else:
+            raise ValueError(f"unknown world layout: {layout!r}")
+
+        free = np.ones(number_of_cells, dtype=bool)
+        free[city_cells] = False
+        wall_cells = rng.choice(np.flatnonzero(free), config.NUMBER_OF_WALLS, replace=False)
+        return city_cells, wall_cells
+
+    """ returns the cells of `count` distinct cities scattered around NUMBER_OF_CLUSTERS random centres """
+    def _clustered_cells(self, count, rng):
+        centres_x = rng.integers(0, self.width, config.NUMBER_OF_CLUSTERS)
+        centres_y = rng.integers(0, self.height, config.NUMBER_OF_CLUSTERS)
+        spread = max(1.0, min(self.width, self.height) / 10)
+        max_spread = max(self.width, self.height)
+
+        cells = np.empty(0, dtype=np.int64)
+        stalled = 0
+        while len(cells) < count and stalled < 2:
+            # draw a batch of points around the centres, and keep the cells that are not used yet
+            centre = rng.integers(0, config.NUMBER_OF_CLUSTERS, 2 * count)
+            xs = np.clip(np.rint(rng.normal(centres_x[centre], spread)), 0, self.max_x).astype(np.int64)
+            ys = np.clip(np.rint(rng.normal(centres_y[centre], spread)), 0, self.max_y).astype(np.int64)
+            candidates = np.concatenate((cells, ys * self.width + xs))
+            _, first = np.unique(candidates, return_index=True)
+            stalled = stalled + 1 if len(first) == len(cells) else 0
+            cells = candidates[np.sort(first)]
+            # spread the clusters out if they are full
+            spread = min(2 * spread, max_spread)
+
+        # when the world is nearly full, the points drawn land on the cells that are already used
+        #  (or are clipped onto the border), so the remaining cities are placed in random free cells
+        if len(cells) < count:
+            free = np.ones(self.width * self.height, dtype=bool)
+            free[cells] = False
+            cells = np.concatenate((cells, rng.choice(np.flatnonzero(free), count - len(cells), replace=False)))
+        return cells[:count]
+
+    """ returns the cells of `count` cities on an evenly spaced lattice: the numbers of columns and
+         rows follow the shape of the world, and if the lattice has more points than cities, 
+         the points used are spread evenly over all of it.
+    """
+    def _grid_cells(self, count):
+        if count == 0:
+            return np.empty(0, dtype=np.int64)
+        columns = min(self.width, max(1, math.ceil(math.sqrt(count * self.width / self.height))))
+        rows = math.ceil(count / columns)
+        if rows > self.height:
+            rows = self.height
+            columns = math.ceil(count / rows)
+        # the centres of columns x rows equal blocks of the world
+        xs = ((np.arange(columns) + 0.5) * self.width / columns).astype(np.int64)
+        ys = ((np.arange(rows) + 0.5) * self.height / rows).astype(np.int64)
+        cells = (ys[:, None] * self.width + xs[None, :]).ravel()
+        return cells[np.rint(np.linspace(0, len(cells) - 1, count)).astype(np.int64)]
+
     #--------------------------------------------------  
    
     """ access the list of cities """
     def get_cities(self):
+        if self.cities is None:
+            self.cities = list(self.city_table.get_cities())
         return self.cities  
             
     #------------        
             
+    """ access the list of cities, in the order of their index 
+         (get_cities() may have been re-ordered by update_world)
+    """
+    def get_cities_by_index(self):
+        return self.city_table.get_cities()
+
+    #------------
+
     """ set the Cities in a new order """
     def update_world(self, cities):
         self.cities = cities
         
     #------------    
     
+    """ returns an (n x n) NumPy array holding the Euclidean distance between every
+         pair of cities, indexed by City.index. It is calculated once, the first time it is needed.
+         Above MAX_DISTANCE_MATRIX_CITIES cities the matrix would not fit in memory, so an
+         EuclideanDistances object is returned instead, which is indexed in the same way.
+    """
+    def get_distance_matrix(self):
+        if self._distance_matrix is None:
+            distances = EuclideanDistances(self.city_table)
+            if len(self.city_table) <= config.MAX_DISTANCE_MATRIX_CITIES:
+                distances = distances[self.city_table.ids[:, None], self.city_table.ids[None, :]]
+            self._distance_matrix = distances
+        return self._distance_matrix
+
+    """ returns an (n x n) NumPy array holding the length of the shortest path around the walls
+         between every pair of cities, indexed by City.index (np.inf if there is no path).
+         It is calculated once, the first time it is needed, using one BFS flood per city.
+         Above MAX_DISTANCE_MATRIX_CITIES cities the matrix would not fit in memory, so a
+         PathLengths object is returned instead, which is indexed in the same way and floods
+         from each city when it is first needed (keeping at most PATH_LENGTH_CACHE_MB of rows).
+    """
+    def get_path_length_matrix(self):
+        if self._path_length_matrix is None:
+            blocked = np.frombuffer(self.blocked, dtype=np.uint8).reshape(self.height, self.width)
+            number_of_cities = len(self.city_table)
+            if number_of_cities <= config.MAX_DISTANCE_MATRIX_CITIES:
+                self._path_length_matrix = pathfinding.path_length_matrix(
+                    blocked, self.city_table.xs, self.city_table.ys, config.PATHFINDING_PROCESSES)
+            else:
+                max_rows = config.PATH_LENGTH_CACHE_MB * 2**20 // (8 * number_of_cities)
+                self._path_length_matrix = pathfinding.PathLengths(
+                    blocked, self.city_table.xs, self.city_table.ys, max_rows)
+        return self._path_length_matrix
+
+    #------------
+
     """ access the list of walls """
     def get_walls(self):
         return self.walls
@@ -94,19 +238,77 @@ class World():
 
     """ can the agent enter the provided x,y position? """
     def is_traversable(self, pose):
-        return ( (pose not in self.walls) 
-                   and (pose.x >= 0) and (pose.y >= 0) 
-                    and (pose.x <= self.max_x) and (pose.y <= self.max_y) )
+        return self.is_xy_traversable(pose.x, pose.y)
      
     #------------ 
     
     """ can the agent enter the provided x,y position? """
     def is_xy_traversable(self, x, y):
-        return self.is_traversable(Pose(x, y))    
+        return ( (x >= 0) and (y >= 0) 
+                   and (x <= self.max_x) and (y <= self.max_y)
+                    and not self.blocked[y * self.width + x] )
+    
+    #------------ 
+
+    """ the number of the cell at x,y within the occupancy grid """
+    def cell_index(self, x, y):
+        return y * self.width + x
+
+    """ the x,y position of a cell within the occupancy grid """
+    def cell_position(self, cell):
+        y, x = divmod(cell, self.width)
+        return x, y
+
+    """ iterates over the cells (numbers, not Pose objects) that can be reached from the 
+         provided cell, in the same order as get_actions(). 
+    """
+    def neighbour_cells(self, cell):
+        blocked = self.blocked
+        x = cell % self.width
+        if x < self.max_x and not blocked[cell + 1]:
+            yield cell + 1
+        if x > 0 and not blocked[cell - 1]:
+            yield cell - 1
+        if cell + self.width < len(blocked) and not blocked[cell + self.width]:
+            yield cell + self.width
+        if cell >= self.width and not blocked[cell - self.width]:
+            yield cell - self.width
     
     #--------------------------------------------------   
          
-# End of World class        
+# End of World class
+
+
+""" The Euclidean distances between the cities of a CityTable, calculated when they are 
+     looked-up: distances[a, b] works like the distance matrix for arrays of city ids a and b.
+     The distance only depends on |dx| and |dy|, so math.dist is called once for each offset
+     that is looked-up (the first time it is), and the results are gathered. The table only
+     spans the offsets between the cities, not the whole world. This gives exactly the same 
+     values as City.distance_to().
+"""
+class EuclideanDistances():
+
+    def __init__(self, city_table):
+        self.xs = city_table.xs.astype(np.int64)
+        self.ys = city_table.ys.astype(np.int64)
+        width = int(np.ptp(self.xs)) + 1 if len(self.xs) else 1
+        self.height = int(np.ptp(self.ys)) + 1 if len(self.ys) else 1
+        # distance of offset (dx, dy) at dx * height + dy; NaN until it is first looked-up
+        self.offsets = np.full(width * self.height, np.nan)
+
+    def __getitem__(self, key):
+        a, b = key
+        offsets = np.abs(self.xs[a] - self.xs[b]) * self.height + np.abs(self.ys[a] - self.ys[b])
+        distances = self.offsets[offsets]
+        missing = np.isnan(distances)
+        if missing.any():
+            new = np.unique(offsets[missing])
+            dxs, dys = np.divmod(new, self.height)
+            self.offsets[new] = [math.dist([0, 0], [dx, dy]) for dx, dy in zip(dxs.tolist(), dys.tolist())]
+            distances = self.offsets[offsets]
+        return distances
+
+# End of EuclideanDistances class        
             
             
         